@@ -0,0 +1,160 @@
+#===============================================================================
+# Coroutine versions of character generation and name fetching, for use with
+# an asyncio event loop. On Python 2 this is Trollius, asyncio's backport, in
+# which a coroutine waits with `yield From(...)' and returns with
+# `raise Return(...)'.
+#
+# Characters are generated as by Char.new_random(lazy=True), which does not
+# block, and their names are then resolved without blocking the event loop:
+# names which the prefetcher has ready are used at once, and the rest are
+# waited for as futures which the prefetcher's worker threads complete, at most
+# `concurrency' at a time. Only names from a name broker, which are asked for
+# over a socket, are taken in the event loop's default executor.
+#===============================================================================
+import random
+import time
+
+try:
+    import trollius as asyncio
+    from trollius import From, Return
+except ImportError:
+    asyncio = None
+
+import fantasynamegenerators as fantasy
+import dungeon_galaxy as galaxy
+
+def require_asyncio():
+    if asyncio is None: raise ImportError(
+        'dwchargen.aio requires Trollius <https://pypi.python.org/pypi/trollius>.')
+
+coroutine = asyncio.coroutine if asyncio is not None else lambda f: f
+
+#-------------------------------------------------------------------------------
+class AsyncNameSource(object):
+    __slots__ = 'loop', 'semaphore'
+
+    def __init__(self, concurrency=100, loop=None):
+        require_asyncio()
+        self.loop = loop or asyncio.get_event_loop()
+        self.semaphore = asyncio.Semaphore(concurrency, loop=self.loop)
+
+    # Resolves a NamePlan, as NamePlan.resolve does.
+    @coroutine
+    def resolve(self, name_plan):
+        while name_plan.requests:
+            requests, seeds, types = name_plan.take_requests()
+            kinds = list(seeds)
+            names = yield From(asyncio.gather(*[
+                self.name_subtypes(t, seeds[t], types[t]) for t in kinds],
+                loop=self.loop))
+            name_plan.deliver(requests, dict(zip(kinds, names)))
+
+    # Returns a name for each of `seeds', falling back to the other `types' as
+    # NamePlan.resolve does. Only names from the web and the broker are waited
+    # for.
+    @coroutine
+    def name_subtypes(self, main_type, seeds, types=()):
+        if fantasy.backend == 'broker':
+            with (yield From(self.semaphore)):
+                name_subtypes = yield From(self.loop.run_in_executor(None,
+                    self.fallback_names, main_type, seeds, types))
+            raise Return(name_subtypes)
+        if fantasy.backend != 'web' or fantasy.breakers.is_open(main_type):
+            raise Return(self.fallback_names(main_type, seeds, types))
+        name_subtypes = fantasy.prefetcher.take_ready(main_type, len(seeds))
+        missing = len(seeds) - len(name_subtypes)
+        if missing:
+            results = yield From(asyncio.gather(*[
+                self.take(main_type) for i in xrange(missing)],
+                loop=self.loop, return_exceptions=True))
+            name_subtypes.extend(
+                r for r in results if not isinstance(r, Exception))
+            missing = len(seeds) - len(name_subtypes)
+        if missing:
+            name_subtypes.extend(
+                self.fallback_names(main_type, seeds[-missing:], types))
+        raise Return(name_subtypes)
+
+    # Waits for the prefetcher's next name of the type.
+    @coroutine
+    def take(self, main_type):
+        with (yield From(self.semaphore)):
+            future = asyncio.Future(loop=self.loop)
+            fantasy.prefetcher.take_async(main_type, waker(self.loop, future))
+            name_subtype = yield From(future)
+        raise Return(name_subtype)
+
+    # Names that can be had without waiting, from the given types or their
+    # fallbacks.
+    @staticmethod
+    def fallback_names(main_type, seeds, types):
+        deadline = time.time() if fantasy.backend == 'web' else None
+        return fantasy.with_fallbacks(main_type, types, len(seeds),
+            lambda t, n: fantasy.backends[fantasy.backend].name_subtypes(
+                t, seeds[len(seeds)-n:], deadline))
+
+# Returns a prefetcher callback which completes `future' in its event loop.
+def waker(loop, future):
+    def wake(name_subtype, exc_info):
+        try:
+            loop.call_soon_threadsafe(settle, future, name_subtype, exc_info)
+        except RuntimeError:
+            pass # The loop has been closed.
+    return wake
+
+def settle(future, name_subtype, exc_info):
+    if future.done(): return
+    if exc_info is None:
+        future.set_result(name_subtype)
+    else:
+        future.set_exception(exc_info[1])
+
+name_sources = {}
+
+# The default AsyncNameSource of the given event loop.
+def name_source(loop=None):
+    require_asyncio()
+    loop = loop or asyncio.get_event_loop()
+    source = name_sources.get(loop)
+    if source is None:
+        source = name_sources[loop] = AsyncNameSource(loop=loop)
+    return source
+
+#-------------------------------------------------------------------------------
+@coroutine
+def new_char(cls=galaxy.Char, rng=random, source=None):
+    char = cls.new_random(rng=rng, lazy=True)
+    yield From(resolve_batch([char], source))
+    raise Return(char)
+
+@coroutine
+def generate_batch(n, seed=None, start=0, source=None):
+    chars = galaxy.generate_batch(n, seed, start, lazy=True)
+    yield From(resolve_batch(chars, source))
+    raise Return(chars)
+
+@coroutine
+def resolve_batch(chars, source=None):
+    name_plan, pending = galaxy.batch_name_plan(chars)
+    yield From((source or name_source()).resolve(name_plan))
+    for char in pending:
+        char.name_plan = None
+
+@coroutine
+def random_name_subtype(*types, **kwds):
+    rng = kwds.get('rng', random)
+    source = kwds.get('source') or name_source()
+    main_type = rng.choice(types)
+    name_subtypes = yield From(source.name_subtypes(
+        main_type, [rng.getrandbits(64)], types))
+    raise Return(name_subtypes[0])
+
+@coroutine
+def random_name_gender(*types, **kwds):
+    name, subtype = yield From(random_name_subtype(*types, **kwds))
+    raise Return((name, fantasy.subtype_gender(subtype)))
+
+@coroutine
+def random_name(*types, **kwds):
+    name, subtype = yield From(random_name_subtype(*types, **kwds))
+    raise Return(name)
@@ -0,0 +1,339 @@
+#===============================================================================
+# A compact binary format for stored dungeon_galaxy characters, which can be
+# read one character at a time without loading the rest of the archive.
+#
+# Classes, alignments, moves, races and items are stored as small integer IDs,
+# given by their position in the RegistryClass registries; the archive lists
+# the classes it uses by name, so that it can be read after classes are added.
+# Names and other strings are stored once each in a string table. The layout
+# is:
+#
+#   header   magic, version, count and the offsets of the sections below
+#   records  one variable-length record per character
+#   index    the offset of each record, as a 64-bit integer
+#   strings  the number of strings, their offsets and their UTF-8 bytes
+#   types    the names of the classes used, as a JSON list
+#
+# All integers are little-endian.
+#===============================================================================
+from array import array
+from itertools import izip
+import struct
+import json
+import mmap
+import sys
+
+import dungeon_galaxy as galaxy
+import dungeon_world_base as base
+
+MAGIC = 'DWCA'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQQQQ')
+OFFSET = struct.Struct('<Q')
+STRING_SPAN = struct.Struct('<QQ')
+NO_STRING = 0xFFFFFFFF
+
+# Value tags of the slots of stored races and moves.
+ABSENT, STRING, INTEGER, OBJECT = range(4)
+
+# Slots that refer back to unfinished characters, and are never stored.
+TRANSIENT_SLOTS = frozenset(['name_char'])
+
+#-------------------------------------------------------------------------------
+# Returns the stored name of each class that a character may refer to. The
+# registries come first, in order, so that each class has the same ID in every
+# archive written by the same version of the library.
+def type_names():
+    names = []
+    for class_ in galaxy.Class.classes:
+        names.append((class_, class_.__name__))
+        for alignment in class_.Alignment.classes:
+            names.append((alignment, '%s.Alignment.%s'
+                          % (class_.__name__, alignment.__name__)))
+        for move in class_.Move.classes:
+            names.append((move, '%s.Move.%s'
+                          % (class_.__name__, move.__name__)))
+    names.extend((race, race.__name__) for race in galaxy.Race.classes)
+    names.extend((item, item.__name__) for item in galaxy.Item.classes)
+    names.extend((cls, '%s.%s' % (module_name(cls), cls.__name__))
+                 for cls in (galaxy.Move_Human, galaxy.Move_Shifter,
+                             galaxy.Item, base.Move, base.Item))
+    return names
+
+def module_name(cls):
+    return cls.__module__.rsplit('.', 1)[-1]
+
+# The slots of `cls' whose values are stored, in a fixed order.
+slot_lists = {}
+
+def stored_slots(cls):
+    slots = slot_lists.get(cls)
+    if slots is None:
+        slots = []
+        for c in reversed(cls.__mro__):
+            c_slots = c.__dict__.get('__slots__', ())
+            for slot in (c_slots,) if isinstance(c_slots, basestring) \
+                   else c_slots:
+                if slot not in TRANSIENT_SLOTS and slot not in slots:
+                    slots.append(slot)
+        slots = slot_lists[cls] = tuple(slots)
+    return slots
+
+# Returns the value of `obj's `slot', or raises AttributeError if it is unset
+# or hidden by a class attribute, as are the names of most races and moves.
+def slot_value(obj, slot):
+    descriptor = getattr(type(obj), slot, None)
+    if type(descriptor).__name__ != 'member_descriptor':
+        raise AttributeError(slot)
+    return descriptor.__get__(obj, type(obj))
+
+#-------------------------------------------------------------------------------
+# Encodes `char' as a string of struct codes and a list of values, where the
+# code 'S' stands for a string (or None) that is yet to be given its ID in the
+# string table. The result can be passed between processes.
+def encode_char(char, type_ids):
+    codes, values = [], []
+    def put(code, value):
+        codes.append(code)
+        values.append(value)
+
+    put('S', char.name)
+    put('S', char.gender)
+    put('B', char.level)
+    for score in char.abilities.score_array:
+        put('b', score)
+    put('h', char.max_hp)
+    put('h', char.max_load)
+    put('b', char.base_damage.sides)
+    put('b', char.base_damage.add)
+    for obj in (char.class_, char.alignment, char.race):
+        encode_object(obj, type_ids, put)
+    put('H', len(char.inventory))
+    for item in char.inventory:
+        put('H', type_ids[type(item)])
+        put('H', item.quantity)
+        put('S', item.name)
+        put('S', json.dumps(item.tags, sort_keys=True))
+    return ''.join(codes), values
+
+def encode_object(obj, type_ids, put):
+    put('H', type_ids[type(obj)])
+    for slot in stored_slots(type(obj)):
+        try:
+            value = slot_value(obj, slot)
+        except AttributeError:
+            put('B', ABSENT)
+            continue
+        if isinstance(value, (int, long)):
+            put('B', INTEGER)
+            put('i', value)
+        elif isinstance(value, basestring) or value is None:
+            put('B', STRING)
+            put('S', value)
+        else:
+            put('B', OBJECT)
+            encode_object(value, type_ids, put)
+
+#-------------------------------------------------------------------------------
+# Writes characters to an archive at `path'. If `count' is given, characters
+# may be added out of order by giving the index of each.
+class ArchiveWriter(object):
+    def __init__(self, path, count=None):
+        self.file = open(path, 'wb')
+        self.type_ids = {cls: i for i, (cls, name)
+                         in enumerate(type_names())}
+        self.string_ids = {}
+        self.strings = []
+        self.offsets = array('L')
+        if count is not None:
+            self.offsets.extend([0] * count)
+        self.fixed_count = count is not None
+        self.added = 0
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0, 0, 0))
+
+    def add(self, char, index=None):
+        self.add_encoded(encode_char(char, self.type_ids), index)
+
+    def add_encoded(self, (codes, values), index=None):
+        values = [self.string_id(v) if c == 'S' else v
+                  for c, v in izip(codes, values)]
+        offset = self.file.tell()
+        self.file.write(struct.pack('<' + codes.replace('S', 'I'), *values))
+        if self.fixed_count:
+            self.offsets[self.added if index is None else index] = offset
+        else:
+            self.offsets.append(offset)
+        self.added += 1
+
+    def string_id(self, string):
+        if string is None: return NO_STRING
+        id = self.string_ids.get(string)
+        if id is None:
+            id = self.string_ids[string] = len(self.strings)
+            self.strings.append(
+                string.encode('utf-8') if isinstance(string, unicode)
+                else string)
+        return id
+
+    def close(self):
+        if self.file.closed: return
+        if self.fixed_count and self.added != len(self.offsets):
+            raise ValueError('%d characters were added to an archive of %d.'
+                             % (self.added, len(self.offsets)))
+        index_offset = self.file.tell()
+        write_offsets(self.file, self.offsets)
+
+        strings_offset = self.file.tell()
+        self.file.write(OFFSET.pack(len(self.strings)))
+        string_offsets, total = array('L', [0]), 0
+        for string in self.strings:
+            total += len(string)
+            string_offsets.append(total)
+        write_offsets(self.file, string_offsets)
+        for string in self.strings:
+            self.file.write(string)
+
+        types_offset = self.file.tell()
+        self.file.write(json.dumps([name for cls, name in type_names()]))
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, len(self.offsets),
+            index_offset, strings_offset, types_offset))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+def write_offsets(file, offsets):
+    if offsets.itemsize == 8 and sys.byteorder == 'little':
+        offsets.tofile(file)
+    else:
+        for offset in offsets:
+            file.write(OFFSET.pack(offset))
+
+def write_archive(chars, path):
+    with ArchiveWriter(path) as writer:
+        for char in chars:
+            writer.add(char)
+
+#-------------------------------------------------------------------------------
+# Reads characters from an archive by index, through a memory map of the file.
+class ArchiveReader(object):
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self.count, self.index_offset,
+         self.strings_offset, types_offset) = HEADER.unpack_from(self.map)
+        if magic != MAGIC: raise ValueError(
+            '%s is not a character archive.' % path)
+        if version != VERSION: raise ValueError(
+            '%s has version %r, not %r.' % (path, version, VERSION))
+        classes = {name: cls for cls, name in type_names()}
+        try:
+            self.types = [classes[name] for name
+                          in json.loads(self.map[types_offset:])]
+        except KeyError as e: raise ValueError(
+            '%s refers to an unknown class: %s.' % (path, e.args[0]))
+        self.string_count, = OFFSET.unpack_from(self.map, self.strings_offset)
+        self.strings_blob = self.strings_offset + 8*(self.string_count + 2)
+        self.tag_dicts = {}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, k):
+        if k < 0: k += self.count
+        if not 0 <= k < self.count: raise IndexError(
+            'character index out of range')
+        offset, = OFFSET.unpack_from(self.map, self.index_offset + 8*k)
+        return Record(self, offset).char()
+
+    def __iter__(self):
+        for k in xrange(self.count):
+            yield self[k]
+
+    def string(self, id):
+        if id == NO_STRING: return None
+        start, end = STRING_SPAN.unpack_from(
+            self.map, self.strings_offset + 8 + 8*id)
+        blob = self.strings_blob
+        return self.map[blob+start:blob+end].decode('utf-8')
+
+    def tags(self, id):
+        tags = self.tag_dicts.get(id)
+        if tags is None:
+            tags = {str(tag): tuple(value) if type(value) is list else value
+                    for tag, value in json.loads(self.string(id)).iteritems()}
+            tags = base.Item.shared_tags(tags)
+            self.tag_dicts[id] = tags
+        return tags
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+structs = {}
+
+# Decodes one record, reading the values in the order encode_char wrote them.
+class Record(object):
+    __slots__ = 'reader', 'offset'
+
+    def __init__(self, reader, offset):
+        self.reader = reader
+        self.offset = offset
+
+    def read(self, format):
+        format = structs.get(format) or structs.setdefault(
+            format, struct.Struct('<' + format))
+        values = format.unpack_from(self.reader.map, self.offset)
+        self.offset += format.size
+        return values
+
+    def char(self):
+        reader = self.reader
+        char = galaxy.Char()
+        char.name_plan = None
+        name, gender, char.level = self.read('IIB')
+        char.name, char.gender = reader.string(name), reader.string(gender)
+        char.abilities = galaxy.Abilities()
+        for ability, score in zip(base.Abilities.ability_names,
+                                  self.read('6b')):
+            char.abilities.set_ability_score(ability, score)
+        char.max_hp, char.max_load, sides, add = self.read('hhbb')
+        char.base_damage = base.Damage(sides, add)
+        char.class_ = self.object()
+        char.alignment = self.object()
+        char.race = self.object()
+        count, = self.read('H')
+        for _ in xrange(count):
+            type_id, quantity, name, tags = self.read('HHII')
+            cls = reader.types[type_id]
+            item = cls.__new__(cls)
+            name = reader.string(name)
+            if name != cls.name:
+                item.name = name
+            if quantity != 1:
+                item.quantity = quantity
+            item.tags = reader.tags(tags)
+            char.inventory.add(item)
+        return char
+
+    def object(self):
+        cls = self.reader.types[self.read('H')[0]]
+        obj = cls.__new__(cls)
+        for slot in stored_slots(cls):
+            tag, = self.read('B')
+            if tag == INTEGER:
+                setattr(obj, slot, self.read('i')[0])
+            elif tag == STRING:
+                setattr(obj, slot, self.reader.string(self.read('I')[0]))
+            elif tag == OBJECT:
+                setattr(obj, slot, self.object())
+        return obj
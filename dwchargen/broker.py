@@ -0,0 +1,196 @@
+#===============================================================================
+# A name broker: one process that owns the browser drivers, the name prefetcher
+# and the name cache, and from which other processes take names over a local
+# socket. However many processes generate characters with the 'broker' name
+# backend, only the broker's pool of browsers fetches names, so the number of
+# browsers stays the same, and each page of names is shared by all of them.
+#
+# The broker keeps a queue of names of each type, which its prefetcher fills
+# as the web backend's does. It applies backpressure to its clients: while
+# `max_pending' names of a type are already being waited for, further requests
+# for that type wait before they are admitted, or until their deadline, when
+# they are answered with no names at all.
+#
+# Clients send tuples by way of multiprocessing.connection, which pickles them,
+# so the broker should only listen where trusted processes can reach it, or be
+# given an `authkey'.
+#===============================================================================
+from multiprocessing.connection import Listener, Client, AuthenticationError
+import collections
+import threading
+import traceback
+import time
+import os
+
+import fantasynamegenerators as fantasy
+
+# Where the broker listens: the path of a Unix socket, or a (host, port) pair.
+address = 'fantasynamegenerators.broker'
+authkey = None
+
+#-------------------------------------------------------------------------------
+class NameBroker(object):
+    def __init__(self, address=address, authkey=authkey, max_pending=256,
+                 debug=False):
+        if isinstance(address, basestring) and os.path.exists(address):
+            os.unlink(address)
+        self.address = address
+        self.listener = Listener(address, authkey=authkey)
+        self.max_pending = max_pending
+        self.debug = debug
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.pending = collections.Counter()
+        self.served = collections.Counter()
+        self.clients = 0
+        self.refused = 0
+        self.stopped = False
+
+    def serve_forever(self):
+        while not self.stopped:
+            try:
+                connection = self.listener.accept()
+            except (EnvironmentError, EOFError, AuthenticationError):
+                if self.stopped: return
+                continue
+            thread = threading.Thread(
+                name='NameBroker.serve_client(%r)' % self,
+                target=self.serve_client, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def serve_client(self, connection):
+        with self.lock:
+            self.clients += 1
+        try:
+            while True:
+                request = connection.recv()
+                connection.send(self.handle(request))
+        except (EnvironmentError, EOFError):
+            pass
+        finally:
+            connection.close()
+            with self.lock:
+                self.clients -= 1
+
+    # Requests are tuples of an operation and its arguments, and replies are
+    # tuples of 'ok' and a result, or of 'error' and a message.
+    def handle(self, request):
+        op, args = request[0], request[1:]
+        try:
+            if op == 'take':
+                return 'ok', self.take(*args)
+            elif op == 'want':
+                fantasy.prefetcher.want(*args)
+                return 'ok', None
+            elif op == 'stats':
+                return 'ok', self.stats()
+            return 'error', 'Unknown request: %r.' % (op,)
+        except fantasy.NameGenerationException as e:
+            if self.debug: traceback.print_exc()
+            return 'error', str(e)
+
+    # Returns `count' names of the type, or, if `timeout' is given, up to that
+    # many within that many seconds.
+    def take(self, main_type, count, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self.lock:
+            while self.pending[main_type] and \
+                  self.pending[main_type] + count > self.max_pending:
+                if deadline is None:
+                    self.cond.wait()
+                elif deadline > time.time():
+                    self.cond.wait(deadline - time.time())
+                else:
+                    self.refused += 1
+                    return []
+            self.pending[main_type] += count
+        try:
+            name_subtypes = fantasy.backends['web'].name_subtypes(
+                main_type, [None] * count, deadline)
+        finally:
+            with self.lock:
+                self.pending[main_type] -= count
+                self.cond.notify_all()
+        with self.lock:
+            self.served[main_type] += len(name_subtypes)
+        return name_subtypes
+
+    def stats(self):
+        with self.lock:
+            return collections.OrderedDict([
+                ('clients',     self.clients),
+                ('served',      sum(self.served.itervalues())),
+                ('pending',     sum(self.pending.itervalues())),
+                ('refused',     self.refused),
+                ('pool',        fantasy.pool.stats())])
+
+    def close(self):
+        self.stopped = True
+        self.listener.close()
+        if isinstance(self.address, basestring) and \
+           os.path.exists(self.address):
+            os.unlink(self.address)
+
+#-------------------------------------------------------------------------------
+# Takes names from the broker at `address'. Each thread has its own connection,
+# which is made again after the process forks. If the broker cannot be reached,
+# names are not prefetched, and taking them raises NameGenerationException, so
+# that the fallbacks are used.
+class BrokerBackend(object):
+    __slots__ = 'local', 'wanted'
+
+    def __init__(self):
+        self.local = threading.local()
+        self.wanted = set()
+
+    def name_subtype(self, main_type, rng=None, deadline=None):
+        name_subtypes = self.name_subtypes(main_type, [None], deadline)
+        if not name_subtypes: raise fantasy.NameGenerationException(
+            main_type, address, None, None,
+            IOError('No names were ready before the deadline.'))
+        return name_subtypes[0]
+
+    def name_subtypes(self, main_type, seeds, deadline=None):
+        timeout = None if deadline is None else max(0, deadline - time.time())
+        return self.request(main_type, 'take', main_type, len(seeds), timeout)
+
+    # Asks the broker for the types from another thread, so that prefetching
+    # never waits for the broker.
+    def prefetch(self, *types):
+        types = [t for t in types if t not in self.wanted]
+        if not types: return
+        self.wanted.update(types)
+        thread = threading.Thread(name='BrokerBackend.want(%r)' % self,
+                                  target=self.want, args=(types,))
+        thread.daemon = True
+        thread.start()
+
+    def want(self, types):
+        try:
+            self.request(types[0], 'want', *types)
+        except fantasy.NameGenerationException:
+            self.wanted.difference_update(types)
+
+    def stats(self):
+        return self.request(None, 'stats')
+
+    def request(self, main_type, *request):
+        local = self.local
+        try:
+            if getattr(local, 'pid', None) != os.getpid():
+                local.connection = Client(address, authkey=authkey)
+                local.pid = os.getpid()
+            local.connection.send(request)
+            status, result = local.connection.recv()
+        except (EnvironmentError, EOFError, AuthenticationError) as e:
+            if getattr(local, 'pid', None) == os.getpid():
+                local.connection.close()
+            local.pid = None
+            raise fantasy.NameGenerationException(
+                main_type, address, None, None, e)
+        if status == 'error': raise fantasy.NameGenerationException(
+            main_type, address, None, None, IOError(result))
+        return result
+
+fantasy.backends['broker'] = BrokerBackend()
@@ -0,0 +1,97 @@
+#===============================================================================
+# A columnar engine for the parts of dungeon_galaxy characters that do not
+# depend on names: ability scores and modifiers, class, race, HP, load and
+# damage are generated for a whole batch at once as NumPy arrays. Characters
+# are only built as objects when they are asked for.
+#===============================================================================
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import dungeon_galaxy as galaxy
+import dungeon_world_base as base
+import utility as util
+
+ABILITY_SCORES = (16, 15, 13, 12, 9, 8)
+STRENGTH = base.Abilities.ability_indices['strength']
+CONSTITUTION = base.Abilities.ability_indices['constitution']
+
+def require_numpy():
+    if numpy is None: raise ImportError(
+        'The columnar engine requires NumPy <http://www.numpy.org>.')
+
+#-------------------------------------------------------------------------------
+class CharBatch(object):
+    __slots__ = ('seed', 'classes', 'races', 'scores', 'modifiers',
+                 'class_ids', 'race_ids', 'max_hp', 'max_load',
+                 'damage_sides', 'damage_add')
+
+    def __init__(self, n, seed=None):
+        require_numpy()
+        state = numpy.random.RandomState(seed)
+        self.seed = seed
+        self.classes = list(galaxy.Class.classes)
+        self.races = list(galaxy.Race.classes)
+
+        # Each row of `permutations' is a random permutation of range(6).
+        permutations = numpy.argsort(
+            state.random_sample((n, len(ABILITY_SCORES))), axis=1)
+        self.scores = numpy.array(ABILITY_SCORES, numpy.int8)[permutations]
+        self.modifiers = modifier_table()[self.scores]
+
+        self.class_ids = random_ids(state, self.classes, n)
+        self.race_ids = random_ids(state, self.races, n)
+
+        class_stats = numpy.array([
+            (c.base_hp, c.base_load, c.base_damage.sides, c.base_damage.add)
+            for c in self.classes]).T[:, self.class_ids]
+        race_stats = numpy.array([
+            race_bonuses(r) for r in self.races]).T[:, self.race_ids]
+        self.max_hp = (class_stats[0] + race_stats[0]
+                       + self.scores[:, CONSTITUTION])
+        self.max_load = (class_stats[1] + race_stats[1]
+                         + self.modifiers[:, STRENGTH])
+        self.damage_sides = class_stats[2] + race_stats[2]
+        self.damage_add = class_stats[3] + race_stats[3]
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    def __getitem__(self, i):
+        return self.char(i)
+
+    # Builds the `i'th character, completing the parts not generated here with
+    # `rng', by default one derived from the batch's seed and `i'. The result
+    # agrees with the arrays.
+    def char(self, i, rng=None, name_plan=None):
+        if rng is None:
+            rng = random if self.seed is None else \
+                  random.Random(util.derived_seed(self.seed, i))
+        char = galaxy.Char()
+        char.name_plan = name_plan
+        char.abilities = galaxy.Abilities()
+        for ability, score in zip(base.Abilities.ability_names, self.scores[i]):
+            char.abilities.set_ability_score(ability, int(score))
+        char.class_ = self.classes[self.class_ids[i]]()
+        char.race = self.races[self.race_ids[i]].new_random(char, rng=rng)
+        char.finish_random(rng)
+        return char
+
+def modifier_table():
+    require_numpy()
+    return numpy.array(
+        [base.Abilities.score_modifier(s) for s in xrange(128)], numpy.int8)
+
+def random_ids(state, classes, n):
+    frequencies = numpy.array([c.frequency for c in classes], float)
+    return state.choice(len(classes), n, p=frequencies/frequencies.sum())
+
+# Returns what applying a race adds to HP, load, damage sides and damage bonus.
+def race_bonuses(race):
+    char = galaxy.Char()
+    race().apply(char)
+    return (char.max_hp, char.max_load,
+            char.base_damage.sides, char.base_damage.add)
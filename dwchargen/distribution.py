@@ -0,0 +1,165 @@
+#===============================================================================
+# Exact probabilities of the outcomes of dungeon_galaxy's random choices, found
+# by enumerating the registries that they are drawn from rather than by
+# sampling characters. No names are generated.
+#
+# A character's class, race, alignment, inventory options and ability scores
+# are chosen independently, as in Char.set_random; the further choices made
+# for some racial moves (Move_Human's extra move, Move_Shifter's second race)
+# are not enumerated.
+#===============================================================================
+from fractions import Fraction
+from itertools import permutations, product
+import collections
+
+import dungeon_galaxy as galaxy
+import dungeon_world_base as base
+
+ABILITY_SCORES = (16, 15, 13, 12, 9, 8)
+
+# The abilities that each statistic depends on, for stat_distribution().
+STAT_ABILITIES = {
+    'max_hp':    ('constitution',),
+    'max_load':  ('strength',),
+    'damage':    (),
+    'armour':    (),
+    'load_used': ()}
+
+#-------------------------------------------------------------------------------
+# A map from outcomes to their probabilities, as Fractions.
+class Distribution(dict):
+    @classmethod
+    def weighted(cls, outcomes, weights):
+        total = sum(weights)
+        dist = cls()
+        for outcome, weight in zip(outcomes, weights):
+            dist[outcome] = dist.get(outcome, 0) + Fraction(weight, total)
+        return dist
+
+    @classmethod
+    def uniform(cls, outcomes):
+        outcomes = list(outcomes)
+        return cls.weighted(outcomes, [1] * len(outcomes))
+
+    # The distribution of `f(outcome)'.
+    def map(self, f):
+        dist = Distribution()
+        for outcome, p in self.iteritems():
+            value = f(outcome)
+            dist[value] = dist.get(value, 0) + p
+        return dist
+
+    # The distribution of the outcomes of `f(outcome)', which returns a
+    # Distribution that may depend on this one's outcome.
+    def bind(self, f):
+        dist = Distribution()
+        for outcome, p in self.iteritems():
+            for value, q in f(outcome).iteritems():
+                dist[value] = dist.get(value, 0) + p*q
+        return dist
+
+    # The joint distribution of the outcomes of independent distributions, as
+    # tuples.
+    @classmethod
+    def product(cls, *dists):
+        dist = cls({(): Fraction(1)})
+        for other in dists:
+            dist = dist.bind(lambda outcome: other.map(
+                lambda value: outcome + (value,)))
+        return dist
+
+    def probability(self, predicate):
+        return sum((p for o, p in self.iteritems() if predicate(o)),
+                   Fraction(0))
+
+    def mean(self, f=lambda outcome: outcome):
+        return sum((f(o)*p for o, p in self.iteritems()), Fraction(0))
+
+    def sorted_items(self):
+        return sorted(self.iteritems())
+
+#-------------------------------------------------------------------------------
+# The distribution of cls.new_random()'s class, as given by random_class().
+def registry_distribution(cls):
+    if cls in cls.classes:
+        return Distribution({cls: Fraction(1)})
+    return Distribution.weighted(
+        cls.classes, [c.frequency for c in cls.classes])
+
+def class_distribution():
+    return registry_distribution(galaxy.Class)
+
+def race_distribution():
+    return registry_distribution(galaxy.Race)
+
+def alignment_distribution(class_):
+    return registry_distribution(class_.Alignment)
+
+# The distribution of the tuple of options that `class_' chooses from its
+# Inventory_Choice registries, in the order that they are added.
+def inventory_distribution(class_):
+    return Distribution.product(*[
+        registry_distribution(choice)
+        for choice in class_.Inventory_Choice.classes])
+
+# The distribution of the tuple of scores of the given abilities. The scores
+# of the other abilities do not affect it, so they need not be enumerated.
+def ability_distribution(abilities=base.Abilities.ability_names):
+    return Distribution.uniform(permutations(ABILITY_SCORES, len(abilities)))
+
+#-------------------------------------------------------------------------------
+Profile = collections.namedtuple(
+    'Profile', 'class_ race alignment inventory scores')
+
+# The joint distribution of the choices made for a character. If `alignments'
+# is false, the alignment is None; `abilities' are the abilities whose scores
+# are enumerated, as `Profile.scores'.
+def profile_distribution(abilities=base.Abilities.ability_names,
+                         alignments=True):
+    scores = ability_distribution(abilities)
+    races = race_distribution()
+    def class_profiles(class_):
+        return Distribution.product(
+            Distribution({class_: Fraction(1)}),
+            races,
+            alignment_distribution(class_) if alignments
+                else Distribution({None: Fraction(1)}),
+            inventory_distribution(class_),
+            scores
+        ).map(lambda outcome: Profile(*outcome))
+    return class_distribution().bind(class_profiles)
+
+# Builds a character from a profile, without names. Abilities not given in
+# `abilities' have score 0.
+def profile_char(profile, abilities=base.Abilities.ability_names):
+    char = galaxy.Char()
+    char.name_plan = None
+    char.abilities = galaxy.Abilities()
+    for ability, score in zip(abilities, profile.scores):
+        char.abilities.set_ability_score(ability, score)
+    char.class_ = profile.class_()
+    char.race = profile.race()
+    char.class_.apply(char)
+    char.race.apply(char)
+    if profile.alignment is not None:
+        char.alignment = profile.alignment()
+    for option in profile.inventory:
+        char.inventory += option()
+    return char
+
+# The distribution of `key(char)' over all characters. `key' may only use the
+# scores of the given abilities, and the alignment if `alignments' is true;
+# enumerating fewer of them is much faster.
+def char_distribution(key, abilities=base.Abilities.ability_names,
+                      alignments=True):
+    return profile_distribution(abilities, alignments).map(
+        lambda profile: key(profile_char(profile, abilities)))
+
+def stat_distribution(stat):
+    if stat == 'damage':
+        key = lambda char: char.base_damage.summarise()
+    elif stat == 'load_used':
+        key = lambda char: char.inventory.load_used
+    else:
+        key = lambda char: getattr(char, stat)
+    return char_distribution(key, STAT_ABILITIES[stat], alignments=False)
@@ -10,25 +10,115 @@ import dungeon_world_base as base
 import utility as util
 
 #-------------------------------------------------------------------------------
+# If a character is generated with `lazy=True', its name and gender and its
+# race's name are only fetched when one of them is first read, or when
+# resolve() or resolve_batch() is called. If a `deadline' (a value of
+# time.time()) is given, the names are resolved by then, using cached or
+# offline names if there is not time to fetch them. If `class_' is given, it is
+# the character's class, rather than one chosen at random.
 class Char(base.Char):
-    def set_random(self):
+    __slots__ = 'name_plan',
+
+    def set_random(self, name_plan=None, rng=random, lazy=False, deadline=None,
+                   class_=None):
         super(Char, self).__init__()
+        own_plan = name_plan is None and (lazy or deadline is not None)
+        if own_plan:
+            name_plan = fantasy.NamePlan(deadline)
+        self.name_plan = name_plan
 
-        self.abilities = Abilities.new_random()
+        self.abilities = Abilities.new_random(rng=rng)
 
-        self.class_ = Class.new_random(self)
-        self.race = Race.new_random(self)
+        self.class_ = (class_ or Class).new_random(self, rng=rng)
+        self.race = Race.new_random(self, rng=rng)
+        self.finish_random(rng)
+        if own_plan and not lazy:
+            self.resolve()
 
+    # Completes a character whose abilities, class and race have been chosen.
+    def finish_random(self, rng=random):
         self.class_.apply(self)
         self.race.apply(self)
 
-        self.class_.apply_random(self)
-        self.race.apply_random(self)
+        self.class_.apply_random(self, rng=rng)
+        self.race.apply_random(self, rng=rng)
+
+    # Calls `callback(name, subtype)' with a random name of one of the given
+    # types, either now or, if this character's names are being fetched later,
+    # when they are resolved.
+    def request_name(self, types, callback, rng=random):
+        if self.name_plan is None:
+            name_plan = fantasy.NamePlan()
+            name_plan.request(types, callback, rng)
+            name_plan.resolve()
+        else:
+            self.name_plan.request(types, callback, rng)
+
+    # Fetches any names that are still pending, returning True if there were
+    # any.
+    def resolve(self):
+        name_plan = getattr(self, 'name_plan', None)
+        if name_plan is None: return False
+        name_plan.resolve()
+        self.name_plan = None
+        return True
+
+    # A coroutine which generates a character with dwchargen.aio, without
+    # blocking its event loop to fetch names.
+    @classmethod
+    def new_random_async(cls, rng=random, source=None):
+        import aio
+        return aio.new_char(cls, rng, source)
+
+    def __getattr__(self, attr):
+        if attr in ('name', 'gender') and self.resolve():
+            return getattr(self, attr)
+        raise AttributeError('%r object has no attribute %r'
+                             % (type(self).__name__, attr))
+
+# Generates `n' characters, of the class `class_' if it is given, fetching all
+# the names they need together, unless `lazy' is true, by `deadline' if it is
+# given. If `seed' is given, the character at index `i' has its own random
+# generator seeded by `util.derived_seed(seed, start+i)', so that it can be
+# regenerated alone with `generate_batch(1, seed, start+i)'. Names fetched
+# from the web are the exception, as they are not random-seeded.
+def generate_batch(n, seed=None, start=0, lazy=False, deadline=None,
+                   class_=None):
+    chars = []
+    for i in xrange(n):
+        rng = random if seed is None else \
+              random.Random(util.derived_seed(seed, start + i))
+        chars.append(Char.new_random(
+            rng=rng, lazy=True, deadline=deadline, class_=class_))
+    if not lazy:
+        resolve_batch(chars, deadline)
+    return chars
+
+# Fetches the pending names of all the given characters together, by
+# `deadline' if it is given.
+def resolve_batch(chars, deadline=None):
+    name_plan, pending = batch_name_plan(chars, deadline)
+    name_plan.resolve()
+    for char in pending:
+        char.name_plan = None
+
+# Returns one NamePlan for the pending names of all the given characters, and
+# the characters that have pending names, which now share the plan.
+def batch_name_plan(chars, deadline=None):
+    name_plan = fantasy.NamePlan(deadline)
+    pending = [char for char in chars
+               if getattr(char, 'name_plan', None) is not None]
+    for char in pending:
+        name_plan.requests.extend(char.name_plan.requests)
+        char.name_plan = name_plan
+    fantasy.prefetch_names(*name_types())
+    return name_plan, pending
 
 class Abilities(base.Abilities, util.Random):
-    def set_random(self):
+    __slots__ = ()
+    def set_random(self, rng=random):
         scores = [16, 15, 13, 12, 9, 8]
-        random.shuffle(scores)
+        rng.shuffle(scores)
         for ability, score in izip(self.ability_names, scores):
             self.set_ability_score(ability, score)
 
@@ -152,53 +242,71 @@ class Item_Rocket(Item):
 
 #===============================================================================
 class Race(base.Race, util.Registry):
-    pass
+    __slots__ = ()
 
 class Race_Human(Race):
+    __slots__ = ()
     name = 'Human'
     frequency = 5
-    def set_random(self, char):
-        self.racial_move = Move_Human.new_random(char)
-    def apply_random(self, char):
-        char.name, char.gender = fantasy.random_name_gender(*(
-            ['futuristic', 'human sw'] + getattr(self, 'human_name_types', [])))
-        if char.gender is None:
-            char.gender = random.choice(['male', 'female'])
+    def set_random(self, char, rng=random):
+        self.racial_move = Move_Human.new_random(char, rng=rng)
+    def apply_random(self, char, rng=random):
+        def set_name(name, subtype):
+            char.name = name
+            char.gender = fantasy.subtype_gender(subtype)
+            if char.gender is None:
+                char.gender = rng.choice(['male', 'female'])
+        char.request_name(
+            ['futuristic', 'human sw'] + getattr(self, 'human_name_types', []),
+            set_name, rng)
 
 class Move_Human(base.Move):
-#    __slots__ = 'extra_move'
+    __slots__ = 'extra_move',
     def __init__(self):
         super(Move_Human, self).__init__('Human', 'Take a starting move '
             'from a class nobody else is playing, or a level 2-5 advanced move '
             'from your own class.')
-    def set_random(self, char):
-        move_class = random.choice(
-            [m for c in Class.classes if not isinstance(char.class_, c)
-               for m in c.Move.classes if issubclass(m, base.Move_Starting)] +
-            [m for m in char.class_.Move.classes
-               if issubclass(m, base.Move_Advanced_2)])
-        self.extra_move = move_class.new_random(char)
+    def set_random(self, char, rng=random):
+        move_class = rng.choice(move_candidates('human', char))
+        self.extra_move = move_class.new_random(char, rng=rng)
     def summarise_parenthetical(self):
         return 'gain %s' % self.extra_move.summarise_with_class()
 
 class Race_Alien(Race, util.AbstractSubRegistry):
-    def set_random(self, char):
-        self.name = fantasy.random_name(*(
-            ['alien'] + getattr(self, 'race_name_types', [])))
-    def apply_random(self, char):
-        while True:
-            char.name, char.gender = fantasy.random_name_gender(*(
-                ['alien', 'pet alien'] +
-                getattr(self, 'char_name_types', [])))
-            if self.name != char.name: break
-        
+    # The character whose name plan will give this race its name, if pending.
+    __slots__ = 'name_char',
+    def set_random(self, char, rng=random):
+        def set_name(name, subtype):
+            self.name = name
+            self.name_char = None
+        self.name_char = char
+        char.request_name(
+            ['alien'] + getattr(self, 'race_name_types', []), set_name, rng)
+    def __getattr__(self, attr):
+        if attr == 'name':
+            char = getattr(self, 'name_char', None)
+            if char is not None and char.resolve():
+                return self.name
+        raise AttributeError('%r object has no attribute %r'
+                             % (type(self).__name__, attr))
+    def apply_random(self, char, rng=random):
+        types = ['alien', 'pet alien'] + getattr(self, 'char_name_types', [])
+        def set_name(name, subtype):
+            if name == self.name:
+                char.request_name(types, set_name, rng)
+            else:
+                char.name = name
+                char.gender = fantasy.subtype_gender(subtype)
+        char.request_name(types, set_name, rng)
 
 class Race_Small(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Small', 'Your race is tiny. When you defy danger '
         'and use your small size to your advantage, take +1.')
     char_name_types = ['dwarf', 'hobbit', 'fairy', 'christmas elf']
 
 class Race_Huge(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Huge', 'Your race is uncommonly large. You start '
         'with 3 more HP than normal.')
     char_name_types = ['giant', 'ogre', 'troll']
@@ -207,113 +315,130 @@ class Race_Huge(Race_Alien):
         char.max_hp += 3
 
 class Race_Hardy(Race_Alien):
+    __slots__ = ()
     race_name_types = ['mutant species']
     racial_move = base.Move('Hardy', 'Your race has adapted to a harmful '
         'environment. When you defy danger to resist poisons or '
         'disease, take +1.')
 
 class Race_Flyer(Race_Alien):
+    __slots__ = ()
     char_name_types = ['angel', 'griffin', 'harpy', 'pegasus', 'fairy']
     racial_move = base.Move('Flyer', 'Your race has wings (or some other '
         'natural method of flying) and can fly or float around freely '
         'in most atmospheres')
 
 class Race_Climber(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Climber', 'Your race is naturally equipped to '
         'scale any solid surface easily.')
     char_name_types = ['star trek caitian']
 
 class Race_Burrowing(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Burrowing', 'Your race is naturally equipped to '
         'dig through dirt and stone.')
 
 class Race_Amphibian(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Amphibian', 'Your race is skilled at swimming and '
         'can breathe and move around effortlessly underwater.')
     char_name_types = ['mermaid']
 
 class Race_Scaled(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Scaled', 'Your race is covered in tough scales. '
         'When you wear no armor, you have 2 armor anyways.')
     char_name_types = ['star trek saurian']
 
 class Race_Chitinous(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Chitinous', 'Your race is protected by thick '
         'shells of bone. When you wear no armor, you have 2 armor '
         'anyways.')
     char_name_types = ['star trek jemhadar']
 
 class Race_Clawed(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Clawed', 'Your race naturally has sharp claws. '
         'You may use them as a hand weapon, and they do +1 damage.')
     char_name_types = ['succubus', 'demon', 'star trek gorn']
 
 class Race_Venomous(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Venomous', 'Your race has a set of venomous '
         'fangs. You may use them as a hand weapon, and in addition '
         'to damage they will poison the target.')
     char_name_types = ['star trek saurian', 'star trek gorn']
 
 class Race_Acidic(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Acidic', "Your race's spit is a lethal, acidic "
         "weapon. You may use it as a near weapon with 1 piercing.")
     char_name_types = ['star trek saurian']
 
 class Race_Vampiric(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Vampiric', 'Your race thrives on blood. When you '
         'consume fresh blood, take +1 forward and heal 1d4 damage.')
     char_name_types = ['vampire']
 
 class Race_Hivemind(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Hivemind', 'You share a deep connection with those '
         'of your race. When nearby members of your race are in danger,'
         ' the GM will tell you this and where you feel it coming from.')
 
 class Race_Phototroph(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Phototroph', 'Your race absorbs energy from light. '
         'When Making Camp in an area exposed to sunlight, you require '
         'no rations and take +1 forward.')
     char_name_types = ['ent']
 
 class Race_Amorphous(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Amorphous', "Your race's strange alien bodies "
         "have no clearly-defined shape. You can squeeze into tight "
         "spaces and stretch out your form freely, but almost all worn "
         "equipment is useless to you.")
 
 class Race_Tentacled(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Tentacled', 'Your race has many long prehensile '
         'limbs. Ignore the "two-handed" tag on weapons, and all your '
         'melee attacks have the "reach" range.')
 
 class Race_Shifter(Race_Alien):
+    __slots__ = ()
     char_name_types = ['shapeshifter']
-    def set_random(self, char):
-        super(Race_Shifter, self).set_random(char)
-        self.racial_move = Move_Shifter.new_random(char)
+    def set_random(self, char, rng=random):
+        super(Race_Shifter, self).set_random(char, rng)
+        self.racial_move = Move_Shifter.new_random(char, rng=rng)
 
 class Move_Shifter(base.Move): 
-#    __slots__ = 'shift_condition', 'shift_race'
+    __slots__ = 'shift_condition', 'shift_race'
     def __init__(self):
         super(Move_Shifter, self).__init__('Shifter', 'Your race has '
             'evolved to shift uncontrollably into an almost completely '
             'different form under specific environmental conditions. Describe '
             'the conditions and choose a second racial move to represent the '
             'transformed state, and take +1 forward whenever you shift.')
-    def set_random(self, char):
-        self.shift_condition = random.choice((
+    def set_random(self, char, rng=random):
+        self.shift_condition = rng.choice((
             'in a vacuum', 'in low air pressure', 'in high air pressure',
             'immersed in liquid', 'wet', 'dry', 'in high temperatures',
             'in low temperatures', 'in bright light', 'in darkness',
             'inside a foreign organism', 'exposed to pathogenic microbes',
             'exposed to toxins', 'exposed to humans', 'exposed to loud noises',
             'exposed to air'))
-        self.shift_race = Race.new_random(char)
+        self.shift_race = Race.new_random(char, rng=rng)
     def summarise_parenthetical(self):
         return 'when %s: %s' % (
             self.shift_condition, self.shift_race.racial_move.summarise())
 
 class Race_Parasitic(Race_Alien):
+    __slots__ = ()
     racial_move = base.Move('Parasitic', "Your race is a parasite with the "
         "ability to control host bodies. When you inhabit a body, you'll gain "
         "an appropriate racial move as long as you control it. Your true form, "
@@ -321,34 +446,82 @@ class Race_Parasitic(Race_Alien):
         "likely to kill you.")
     char_name_types = ['pet insect', 'pet crab']
     
+#-------------------------------------------------------------------------------
+# The set is computed again only if races have been added since it was last
+# computed.
+def name_types():
+    global known_name_types
+    race_count, types = known_name_types
+    if race_count != len(Race.classes):
+        types = set(['futuristic', 'human sw', 'alien', 'pet alien'])
+        for race in Race.classes:
+            types.update(getattr(race, 'race_name_types', []))
+            types.update(getattr(race, 'char_name_types', []))
+        types = frozenset(types)
+        known_name_types = len(Race.classes), types
+    return types
+
+known_name_types = None, frozenset()
+
 #===============================================================================
 class Class(base.Class, util.Registry):
-#    __slots__ = 'base_load', 'base_hp', 'base_damage'
+    __slots__ = ()
     def apply(self, char):
         char.max_load += self.base_load + char.abilities.modifiers['strength']
         char.max_hp += self.base_hp + char.abilities.scores['constitution']
         char.base_damage += self.base_damage
         char.inventory += self.Inventory_Base()
-    def apply_random(self, char):
-        char.alignment = self.Alignment.new_random()
+    def apply_random(self, char, rng=random):
+        char.alignment = self.Alignment.new_random(rng=rng)
         for choice in self.Inventory_Choice.classes:
-            char.inventory += choice.new_random()
+            char.inventory += choice.new_random(rng=rng)
     def random_human_name(self):
         raise NotImplementedError
 
 class Move_Multiclass(base.Move_Class):
-#    __slots__ = 'multiclass_move'
-    def set_random(self, char):
-        wrapped_char = util.Wrapper(char, level=char.level-1)
-        self.multiclass_move = random.choice([
-            m.new_random(char)
-            for c in Class.classes if not isinstance(char.class_, c)
-            for m in c.Move.classes if m.eligible(wrapped_char)])
+    __slots__ = 'multiclass_move',
+    def set_random(self, char, rng=random):
+        move_class = rng.choice(move_candidates('multiclass', char))
+        self.multiclass_move = move_class.new_random(char, rng=rng)
     def summarise_parenthetical(self):
         return self.multiclass_move.summarise_with_class()
 
+#-------------------------------------------------------------------------------
+# The move classes that a character may take, by (kind, class, level), where
+# `kind' is 'human' for Move_Human's extra move and 'multiclass' for
+# Move_Multiclass's. Each entry is computed on first use from the registries,
+# so move eligibility must depend only on the character's class and level.
+move_index = {}
+move_index_version = None
+
+def move_candidates(kind, char):
+    global move_index_version
+    if move_index_version != util.RegistryClass.version:
+        move_index.clear()
+        move_index_version = util.RegistryClass.version
+    key = (kind, type(char.class_), char.level)
+    candidates = move_index.get(key)
+    if candidates is None:
+        if kind == 'human':
+            candidates = [
+                m for c in Class.classes if not isinstance(char.class_, c)
+                  for m in c.Move.classes if issubclass(m, base.Move_Starting)
+            ] + [
+                m for m in char.class_.Move.classes
+                  if issubclass(m, base.Move_Advanced_2)]
+        elif kind == 'multiclass':
+            wrapped_char = util.Wrapper(char, level=char.level-1)
+            candidates = [
+                m for c in Class.classes if not isinstance(char.class_, c)
+                  for m in c.Move.classes if m.eligible(wrapped_char)]
+        else:
+            raise ValueError('Unknown kind of move: %r.' % kind)
+        candidates = move_index[key] = tuple(candidates)
+    return candidates
+
 #-------------------------------------------------------------------------------
 class Agent(Class):
+    __slots__ = ()
     name = 'Agent'
     base_load = 9
     base_hp = 6
@@ -374,32 +547,40 @@ class Agent(Class):
             Item_StunGrenade(quantity=2))
 
     class Alignment(base.Move_Alignment, util.Registry):
-        pass
+        __slots__ = ()
     class Good(base.Move_Good, Alignment):
+        __slots__ = ()
         description = 'Risk danger to avoid bloodshed.'
     class Lawful(base.Move_Lawful, Alignment):
+        __slots__ = ()
         description = 'Take control of a dangerous situation.'
     class Chaotic(base.Move_Chaotic, Alignment):
+        __slots__ = ()
         description = 'Reveal a secret of someone powerful.'
     class Evil(base.Move_Evil, Alignment):
+        __slots__ = ()
         description = 'Exploit technology to cause needless violence.'
 
     class Move(base.Move_Class, util.Registry):
-        pass
+        __slots__ = ()
     for m in ('Hacker', 'Augmented', 'Takedown'):
-        type(re.sub(r'\W','',m), (base.Move_Starting, Move), {'name': m})   
+        type(re.sub(r'\W','',m), (base.Move_Starting, Move),
+             {'name': m, '__slots__': ()})
     for m in ('CQC', 'Double Down', 'Conspiracy Theorist', 'Blackmail',
         'Conspirator', 'Start Talking', 'Disguise', 'Remote Access',
         'I\'ve Never Seen Code Like This', 'Martial Artist', 'That Was Amazing',
         'Lethal Takedown', 'Augmented Attack'):
-        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move), {'name': m})
+        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move),
+             {'name': m, '__slots__': ()})
     class MulticlassDabbler(base.Move_Advanced_2, Move, Move_Multiclass):
+        __slots__ = ()
         name = 'Multiclass Dabbler'
 
 Agent.Move.class_ = Agent
 
 #-------------------------------------------------------------------------------
 class BountyHunter(Class):
+    __slots__ = ()
     name = 'Bounty Hunter'
     base_load = 11
     base_hp = 8
@@ -435,32 +616,40 @@ class BountyHunter(Class):
             Item_StunGrenade(quantity=2))
 
     class Alignment(base.Move_Alignment, util.Registry):
-        pass
+        __slots__ = ()
     class Good(base.Move_Good, Alignment):
+        __slots__ = ()
         description = 'Give up reward for the greater good.'
     class Neutral(base.Move_Neutral, Alignment):
+        __slots__ = ()
         description = 'Defeat worthy prey.'
     class Chaotic(base.Move_Chaotic, Alignment):
+        __slots__ = ()
         description = 'Take out your target without regard for collateral damage.'
     class Evil(base.Move_Evil, Alignment):
+        __slots__ = ()
         description = 'Kill a defenceless or surrendered enemy.'
 
     class Move(base.Move_Class, util.Registry):
-        pass
+        __slots__ = ()
     for m in ('Track Down', 'Locked and Loaded', 'Weapons Expert', 'Armored'):
-        type(re.sub(r'\W','',m), (base.Move_Starting, Move), {'name': m})
+        type(re.sub(r'\W','',m), (base.Move_Starting, Move),
+             {'name': m, '__slots__': ()})
     for m in ('For Any Occasion', 'Element of Surprise', 'But You Can\'t Hide',
         'Last Reserves', 'Locked On', 'Came Prepared', 'On the Job',
         'Cooling System', 'Old Fashioned', 'Energy Shields', 'Trophy Hunter',
         'Hunter\'s Instincts'):
-        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move), {'name': m})
+        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move),
+             {'name': m, '__slots__': ()})
     class MulticlassDabbler(base.Move_Advanced_2, Move, Move_Multiclass):
+        __slots__ = ()
         name = 'Multiclass Dabbler'
 
 BountyHunter.Move.class_ = BountyHunter
 
 #-------------------------------------------------------------------------------
 class Commando(Class):
+    __slots__ = ()
     name = 'Commando'
     base_hp = 10
     base_damage = base.Damage(10)
@@ -502,27 +691,33 @@ class Commando(Class):
             Item_Toolbox())
 
     class Alignment(base.Move_Alignment, util.Registry):
-        pass
+        __slots__ = ()
     class Good(base.Move_Good, Alignment):
+        __slots__ = ()
         description = 'Protect someone weaker than you.'
     class Lawful(base.Move_Lawful, Alignment):
+        __slots__ = ()
         description = 'Deny mercy to an enemy of the alliance.'
 
     class Move(base.Move_Class, util.Registry):
-        pass
+        __slots__ = ()
     for m in ('Armored', 'Superior Soldier', 'War Hero', 'Call in the Cavalry'):
-        type(re.sub(r'\W','',m), (base.Move_Starting, Move), {'name': m})
+        type(re.sub(r'\W','',m), (base.Move_Starting, Move),
+             {'name': m, '__slots__': ()})
     for m in ('Superior Commander', 'Full Auto', 'Line in the Sand',
         'You\'re All Clear', 'Controlled Explosion', 'For the Alliance',
         'This is My Weapon', 'In the Name of', 'New Objectives'):
-        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move), {'name': m})
+        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move),
+             {'name': m, '__slots__': ()})
     class MulticlassDabbler(base.Move_Advanced_2, Move, Move_Multiclass):
+        __slots__ = ()
         name = 'Multiclass dabbler'
 
 Commando.Move.class_ = Commando
 
 #-------------------------------------------------------------------------------
 class Outcast(Class):
+    __slots__ = ()
     name = 'Outcast'
     base_hp = 8
     base_damage = base.Damage(6)
@@ -564,31 +759,38 @@ class Outcast(Class):
             Item_Antitoxin(quantity=3))
 
     class Alignment(base.Move_Alignment, util.Registry):
-        pass
+        __slots__ = ()
     class Good(base.Move_Good, Alignment):
+        __slots__ = ()
         description = 'Help someone who is strange to you.'
     class Chaotic(base.Move_Chaotic, Alignment):
+        __slots__ = ()
         description = 'Free someone of their bonds.'
     class Evil(base.Move_Evil, Alignment):
+        __slots__ = ()
         description = 'Spread fear in a civilised place.'
 
     class Move(base.Move_Class, util.Registry):
-        pass
+        __slots__ = ()
     for m in ('Aberration', 'Herbalist', 'Survivor'):
-        type(re.sub(r'\W','',m), (base.Move_Starting, Move), {'name': m})
+        type(re.sub(r'\W','',m), (base.Move_Starting, Move),
+             {'name': m, '__slots__': ()})
     for m in ('Mutant Warrior', 'Trapper', 'Guide', 'Frenzied', 'A Safe Place',
         'First Aid', 'Healer', 'The Secret Ingredient is Love', 'I\'m a Monster',
         'Simpler Times', 'Strong Arm', 'Blaze Brother', 'Strong Arm',
         'Blaze Brother', 'Adaptable', 'Eagle Eye', 'Terrain Advantage',
         'Trained Instincts'):
-        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move), {'name': m})
+        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move),
+             {'name': m, '__slots__': ()})
     class MulticlassDabbler(base.Move_Advanced_2, Move, Move_Multiclass):
+        __slots__ = ()
         name = 'Multiclass dabbler'
 
 Outcast.Move.class_ = Outcast
 
 #-------------------------------------------------------------------------------
 class Scientist(Class):
+    __slots__ = ()
     name = 'Scientist'
     base_hp = 4
     base_damage = base.Damage(4)
@@ -624,32 +826,40 @@ class Scientist(Class):
             Item_Medkit())
 
     class Alignment(base.Move_Alignment, util.Registry):
-        pass
+        __slots__ = ()
     class Good(base.Move_Good, Alignment):
+        __slots__ = ()
         description = 'Use your expertise to help someone.'
     class Chaotic(base.Move_Chaotic, Alignment):
+        __slots__ = ()
         description = 'Wreak havok with your experiments.'
     class Neutral(base.Move_Neutral, Alignment):
+        __slots__ = ()
         description = 'Gain knowledge about your field.'
     class Evil(base.Move_Evil, Alignment):
+        __slots__ = ()
         description = 'Harm innocents to further your research.'
 
     class Move(base.Move_Class, util.Registry):
-        pass
+        __slots__ = ()
     for m in ('Research', 'Development', 'Field Experiment',
         'Controlled Environment'):
-        type(re.sub(r'\W','',m), (base.Move_Starting, Move), {'name': m})
+        type(re.sub(r'\W','',m), (base.Move_Starting, Move),
+             {'name': m, '__slots__': ()})
     for m in ('Surgical Strike', 'Logical', 'Medical Doctor', 'Grease Monkey',
         'Conjecture', 'Ordered Chaos', 'Expanded Horizons', 'Vital Knowledge',
         'Logic Bomb', 'Flashy', 'Next Big Thing'):
-        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move), {'name': m})
+        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move),
+             {'name': m, '__slots__': ()})
     class MulticlassDabbler(base.Move_Advanced_2, Move, Move_Multiclass):
+        __slots__ = ()
         name = 'Multiclass dabbler'
 
 Scientist.Move.class_ = Scientist
 
 #-------------------------------------------------------------------------------
 class Scoundrel(Class):
+    __slots__ = ()
     name = 'Scoundrel'
     base_hp = 6
     base_damage = base.Damage(6)
@@ -694,25 +904,32 @@ class Scoundrel(Class):
             Item_Rations())
 
     class Alignment(base.Move_Alignment, util.Registry):
-        pass
+        __slots__ = ()
     class Good(base.Move_Good, Alignment):
+        __slots__ = ()
         description = 'Give up riches to the less fortunate.'
     class Chaotic(base.Move_Chaotic, Alignment):
+        __slots__ = ()
         description = 'Cheat someone powerful.'
     class Neutral(base.Move_Neutral, Alignment):
+        __slots__ = ()
         description = 'Avoid conflict with cunning.'
     class Evil(base.Move_Evil, Alignment):
+        __slots__ = ()
         description = 'Shift danger or blame from yourself to someone else.'
 
     class Move(base.Move_Class, util.Registry):
-        pass
+        __slots__ = ()
     for m in ('Cheap Shot', 'Charming and Open', 'Reputation'):
-        type(re.sub(r'\W','',m), (base.Move_Starting, Move), {'name': m})
+        type(re.sub(r'\W','',m), (base.Move_Starting, Move),
+             {'name': m, '__slots__': ()})
     for m in ('Experienced Troublemaker', 'Dirty Fighting', 'Renegade',
         'Holdout', 'I Am Altering the Deal', 'Ace in the Hole', 'Quick Shot',
         'Better Than One', 'I Know', 'Tonight\'s Entertainment'):
-        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move), {'name': m})
+        type(re.sub(r'\W','',m), (base.Move_Advanced_2, Move),
+             {'name': m, '__slots__': ()})
     class MulticlassDabbler(base.Move_Advanced_2, Move, Move_Multiclass):
+        __slots__ = ()
         name = 'Multiclass dabbler'
 
 Scoundrel.Move.class_ = Scoundrel
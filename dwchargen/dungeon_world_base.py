@@ -1,13 +1,16 @@
 from itertools import *
 from UserList import UserList
+from array import array
+import collections
+import copy
 
 import utility as util
 
 #===============================================================================
 class Char(util.Random):
-#    __slots__ = (
-#        'name', 'class_', 'alignment_move', 'race', 'gender', 'abilities',
-#        'max_hp', 'max_load', 'base_damage', 'level', 'inventory', 'armour')
+    __slots__ = (
+        'name', 'class_', 'alignment', 'race', 'gender', 'abilities',
+        'max_hp', 'max_load', 'base_damage', 'level', 'inventory')
 
     def __init__(self):
         self.max_hp = 0
@@ -38,7 +41,7 @@ class Char(util.Random):
         return sum(item.tags.get('armour', 0) for item in self.inventory)
 
 class Damage(object):
-#    __slots__ = 'sides', 'add'
+    __slots__ = 'sides', 'add'
     def __init__(self, sides=0, add=0):
         self.sides = sides
         self.add = add
@@ -53,19 +56,67 @@ class Damage(object):
             self.sides,
             '%+d' % self.add != 0 if self.add else '')
 
+# Subclasses give their default name and tags as class attributes, which rules
+# out __slots__; instead, inventories share one read-only prototype of each
+# distinct item (see Item.prototype), and items with the same tags share one
+# read-only Tags dict. To change an item in an inventory, replace it.
 class Item(object):
-#    __slots__ = 'name', 'quantity', 'tags'
     name = None
+    quantity = 1
+    frozen = False
+    prototypes = {}
+    tag_dicts = {}
+
     def __init__(self, *atags, **ktags):
         if 'name' in ktags:
             self.name = ktags.pop('name')
         if 'quantity' in ktags:
             self.quantity = ktags.pop('quantity')
-        elif not hasattr(self, 'quantity'):
-            self.quantity = 1
-        self.tags = getattr(self, 'tags', dict())
-        self.tags.update((tag, True) for tag in atags)
-        self.tags.update(ktags)
+        tags = dict(getattr(self, 'tags', ()))
+        tags.update((tag, True) for tag in atags)
+        tags.update(ktags)
+        self.tags = Item.shared_tags(tags)
+
+    # Returns a read-only copy of `tags', which is shared with every other item
+    # whose tags are equal, unless some of them are unhashable.
+    @staticmethod
+    def shared_tags(tags):
+        try:
+            key = frozenset(tags.iteritems())
+        except TypeError:
+            return Tags(tags)
+        shared = Item.tag_dicts.get(key)
+        if shared is None:
+            shared = Item.tag_dicts.setdefault(key, Tags(tags))
+        return shared
+
+    # Returns the shared, read-only item which is equal to this one.
+    def prototype(self):
+        if self.frozen: return self
+        key = (type(self), self.quantity, self.merge_key())
+        prototype = Item.prototypes.get(key)
+        if prototype is None:
+            prototype = copy.copy(self)
+            prototype.__dict__['frozen'] = True
+            prototype = Item.prototypes.setdefault(key, prototype)
+        return prototype
+
+    def __setattr__(self, attr, value):
+        if self.frozen: raise AttributeError(
+            'Cannot modify %r, which is shared between inventories.' % self)
+        object.__setattr__(self, attr, value)
+
+    def __delattr__(self, attr):
+        if self.frozen: raise AttributeError(
+            'Cannot modify %r, which is shared between inventories.' % self)
+        object.__delattr__(self, attr)
+
+    # Copies are not frozen, even if the original is a prototype.
+    def __copy__(self):
+        item = type(self).__new__(type(self))
+        item.__dict__.update(self.__dict__)
+        item.__dict__.pop('frozen', None)
+        return item
 
     def summarise(self):
         return '%s%s%s' % (
@@ -73,6 +124,14 @@ class Item(object):
             '%d/%d ' % self.tags['uses'] if 'uses' in self.tags else '',
             self.name)
 
+    # Items with equal merge keys can be merged by adding their quantities.
+    def merge_key(self):
+        try:
+            return (self.name, frozenset(self.tags.iteritems()))
+        except TypeError:
+            return (self.name, tuple(sorted(
+                (tag, repr(value)) for tag, value in self.tags.iteritems())))
+
     def merge(self, other):
         if (isinstance(other, Item)
         and other.name == self.name and other.tags == self.tags):
@@ -95,13 +154,34 @@ class Item(object):
                 [('name', self.name)] if self.name else [],
                 self.tags.iteritems())))
 
+# The tags of an item: a dict which cannot be modified in place.
+class Tags(dict):
+    __slots__ = ()
+
+    def read_only(self, *args, **kwds):
+        raise TypeError('Item tags cannot be modified in place; give the item '
+                        'a new dict of tags instead.')
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = \
+        read_only
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return Tags, (dict(self),)
+
+# A list of items in which items that can be merged are kept merged. An index
+# from each item's merge key to its position makes adding an item constant-time.
 class Inventory(UserList):
     def __init__(self, *args):
-        if len(args) == 1 and isinstance(args[0], list):
-            self.data = args[0]
-        else:
-            self.data = list(args)
-        self.compact()
+        self.data = []
+        self.item_positions = {}
+        self.owned_positions = set()
+        self.extend(args[0] if len(args) == 1 and isinstance(args[0], list)
+                    else args)
 
     @property
     def load_used(self):
@@ -110,69 +190,112 @@ class Inventory(UserList):
     def summarise(self):
         return ', '.join(item.summarise() for item in self)
 
+    def add(self, item):
+        key = item.merge_key()
+        position = self.item_positions.get(key)
+        if position is None:
+            self.item_positions[key] = len(self.data)
+            self.data.append(item.prototype())
+        elif position in self.owned_positions:
+            self.data[position].quantity += item.quantity
+        else:
+            # The item at this position is a shared prototype, so it is copied
+            # before its quantity is first changed.
+            merged = copy.copy(self.data[position])
+            merged.quantity += item.quantity
+            self.data[position] = merged
+            self.owned_positions.add(position)
+
+    def rebuild(self):
+        items = self.data
+        self.data = []
+        self.item_positions.clear()
+        self.owned_positions.clear()
+        for item in items:
+            self.add(item)
+
+    def append(self, value):
+        self.add(value)
+
+    def extend(self, values):
+        for value in values:
+            self.add(value)
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def insert(self, i, value):
+        if value.merge_key() in self.item_positions:
+            self.add(value)
+        else:
+            self.data.insert(i, value)
+            self.rebuild()
+
     def __setitem__(self, i, value):
-        result = super(Inventory, self).__setitem__(i, value)
-        self.compact(i, i+1)
-        return result
+        self.data[i] = value
+        self.rebuild()
 
     def __setslice__(self, i, j, values):
-        result = super(Inventory, self).__setslice__(i, j, values)
-        self.compact(i, i + len(values))
-        return result
+        self.data[i:j] = values
+        self.rebuild()
 
-    def __iadd__(self, other):
-        result = super(Inventory, self).__iadd__(other)
-        self.compact(-len(other))
-        return result
+    def __delitem__(self, i):
+        del self.data[i]
+        self.rebuild()
 
-    def __imul__(self, n):
-        for i in range(len(self)):
-            self[i] *= n
-        return result
+    def __delslice__(self, i, j):
+        del self.data[i:j]
+        self.rebuild()
 
-    def append(self, value):
-        result = super(Inventory, self).append(value)
-        self.compact(-1)
-        return result
+    def pop(self, i=-1):
+        value = self.data.pop(i)
+        self.rebuild()
+        return value
 
-    def extend(self, values):
-        result = super(Inventory, self).extend(values)
-        self.compact(-len(values))
-        return result
+    def remove(self, value):
+        self.data.remove(value)
+        self.rebuild()
 
-    def insert(self, i, value):
-        result = super(Inventory, self).insert(i, value)
-        self.compact(i, i+1)
-        return result
-
-    def compact(self, start=None, end=None):
-        length = len(self)
-        start = 0 if start is None else length+start if start<0 else start
-        end = length if end is None else length+end if end<0 else end
-
-        for i in reversed(range(start, end)):
-            for j in chain(range(i), range(i+1, length)):
-                merged = self[i].merge(self[j])
-                if merged is not None:
-                    super(Inventory, self).__setitem__(min(i,j), merged)
-                    del self[max(i,j)]
-                    length -= 1
-                    break
+    def reverse(self):
+        self.data.reverse()
+        self.rebuild()
+
+    def sort(self, *args, **kwds):
+        self.data.sort(*args, **kwds)
+        self.rebuild()
+
+    def __imul__(self, n):
+        for i, item in enumerate(self.data):
+            self.data[i] = copy.copy(item)
+            self.data[i].quantity *= n
+        self.owned_positions.update(xrange(len(self.data)))
+        return self
 
     def __repr__(self):
         return 'Inventory(%s)' % ', '.join(repr(i) for i in self)
 
+# Scores and modifiers are kept in arrays ordered as in ability_names, and can
+# be read by ability name through the `scores' and `modifiers' properties.
 class Abilities(object):
-#    __slots__ = 'scores', 'modifiers'
+    __slots__ = 'score_array', 'modifier_array'
     ability_names = (
         'strength', 'dexterity', 'constitution',
         'intelligence', 'wisdom', 'charisma')
+    ability_indices = {a:i for i, a in enumerate(ability_names)}
     def __init__(self):
-        self.scores    = {a:None for a in self.ability_names}
-        self.modifiers = {a:None for a in self.ability_names}
+        self.score_array    = array('b', [0] * len(self.ability_names))
+        self.modifier_array = array('b', [0] * len(self.ability_names))
+    @property
+    def scores(self):
+        return AbilityMap(self.score_array)
+    @property
+    def modifiers(self):
+        return AbilityMap(self.modifier_array)
     def set_ability_score(self, ability, score):
-        self.scores[ability] = score
-        self.modifiers[ability] = self.score_modifier(score)
+        index = self.ability_indices[ability]
+        self.score_array[index] = score
+        self.modifier_array[index] = self.score_modifier(score)
     def summarise(self):
         return ', '.join(
             '%s %d (%+d)' % (
@@ -191,16 +314,32 @@ class Abilities(object):
           else +2 if score < 18 \
           else +3
 
+# A read-only view of an array of scores or modifiers as a dict of abilities.
+class AbilityMap(collections.Mapping):
+    __slots__ = 'array',
+    def __init__(self, array):
+        self.array = array
+    def __getitem__(self, ability):
+        return self.array[Abilities.ability_indices[ability]]
+    def __iter__(self):
+        return iter(Abilities.ability_names)
+    def __len__(self):
+        return len(Abilities.ability_names)
+    def __contains__(self, ability):
+        return ability in Abilities.ability_indices
+    def __repr__(self):
+        return repr(dict(self))
+
 class Char_Attr(util.Random):
+    __slots__ = ()
     def apply(self, char):
         pass
 
 class Class(Char_Attr):
-#    __slots__ = 'name',
-    pass
+    __slots__ = ()
 
 class Race(Char_Attr):
-#    __slots__ = 'name', 'racial_move'
+    __slots__ = 'name', 'racial_move'
     def summarise(self, char):
         if self.name == self.racial_move.name:
             suffix = self.racial_move.summarise_parenthetical()
@@ -212,7 +351,7 @@ class Race(Char_Attr):
             ' -- %s' % suffix if suffix is not None else '')
 
 class Move(util.Random):
-#    __slots__ = 'name', 'description'
+    __slots__ = 'name', 'description'
     def __init__(self, name=None, description=None):
         if name is not None:
             self.name = name
@@ -225,7 +364,7 @@ class Move(util.Random):
         return summary
 
 class Move_Class(Move):
-#    __slots__ = 'class_'
+    __slots__ = ()
     @classmethod
     def eligible(self, char):
         return True
@@ -235,30 +374,38 @@ class Move_Class(Move):
             summary = '%s (%s)' % (summary, self.summarise_parenthetical())
         return summary
 class Move_Starting(Move_Class):
-    pass
+    __slots__ = ()
 class Move_Advanced(Move_Class):
-    pass
+    __slots__ = ()
 class Move_Advanced_2(Move_Advanced):
+    __slots__ = ()
     @classmethod
     def eligible(self, char):
         return char.level >= 2 \
            and super(Move_Advanced_2, self).eligible(char)
 class Move_Advanced_6(Move_Advanced):
+    __slots__ = ()
     @classmethod
     def eligible(self, char):
         return char.level >= 6 \
            and super(Move_Advanced_6, self).eligible(char)
 
 class Move_Alignment(Move):
+    __slots__ = ()
     def summarise(self):
         return '%s -- %s' % (self.name, self.description)
 class Move_Good(Move_Alignment):
+    __slots__ = ()
     name = 'Good'
 class Move_Lawful(Move_Alignment):
+    __slots__ = ()
     name = 'Lawful'
 class Move_Neutral(Move_Alignment):
+    __slots__ = ()
     name = 'Neutral'
 class Move_Chaotic(Move_Alignment):
+    __slots__ = ()
     name = 'Chaotic'
 class Move_Evil(Move_Alignment):
+    __slots__ = ()
     name = 'Evil'
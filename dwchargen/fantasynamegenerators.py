@@ -2,11 +2,17 @@ from __future__ import print_function
 
 import threading
 import traceback
+import collections
+import itertools
 import httplib
+import heapq
 import weakref
+import warnings
+import sqlite3
 import atexit
 import random
 import string
+import os.path
 import time
 import sys
 import re
@@ -14,12 +20,19 @@ import re
 import selenium.common.exceptions
 import selenium.webdriver
 
+import markov
+
+# The longest that a driver may take to load a page before the load fails.
+page_load_timeout_s = 30
+
 class Driver(selenium.webdriver.PhantomJS):
-    __slots__ = 'pool'
+    __slots__ = 'pool', 'loaded_url'
     def __init__(self, pool, *args, **kwds):
         super(Driver, self).__init__(*args, **kwds)
         self.set_window_size(1360, 768)
+        self.set_page_load_timeout(page_load_timeout_s)
         self.pool = pool
+        self.loaded_url = None
     def __enter__(self):
         return self
     def __exit__(self, *args):
@@ -29,83 +42,259 @@ class Driver(selenium.webdriver.PhantomJS):
             id(self), id(self.pool), action))
 
 class DriverPool(object):
-    __slots__ = ('drivers', 'rlock', 'remove_driver_cond', 'destroyed',
-                 'driver_cache_s', 'debug', '__weakref__')
+    __slots__ = ('idle', 'deadlines', 'expiry', 'expiry_seq', 'live', 'rlock',
+                 'cond', 'destroyed', 'min_size', 'max_size', 'driver_cache_s',
+                 'hits', 'url_hits', 'misses', 'spawns', 'spawn_s_total', 'spawn_s_max',
+                 'waits', 'wait_s_total', 'wait_s_max', 'debug', '__weakref__')
 
-    def __init__(self, driver_cache_s=60, debug=False):
-        self.drivers = []
+    def __init__(self, min_size=0, max_size=4, driver_cache_s=60, debug=False):
+        self.check_sizes(min_size, max_size)
+        self.idle = []
+        self.deadlines = {}
+        self.expiry = []
+        self.expiry_seq = itertools.count()
+        self.live = 0
         self.rlock = threading.RLock()
-        self.remove_driver_cond = threading.Condition(self.rlock)
+        self.cond = threading.Condition(self.rlock)
         self.destroyed = False
+        self.min_size = min_size
+        self.max_size = max_size
         self.driver_cache_s = driver_cache_s
         self.debug = debug
 
+        self.hits = self.url_hits = self.misses = 0
+        self.spawns = 0
+        self.spawn_s_total = self.spawn_s_max = 0.0
+        self.waits = 0
+        self.wait_s_total = self.wait_s_max = 0.0
+
+        # The threads refer to the pool weakly, so that it can be collected.
         threading.Thread(
             name='DriverPool.run_pool(%r)' % self,
-            target=self.run_pool,
-            args=(threading.current_thread(),)
+            target=DriverPool.run_pool,
+            args=(weakref.ref(self), threading.current_thread())
         ).start()
 
-    def get_driver(self):
-        driver = None
+        threading.Thread(
+            name='DriverPool.run_reaper(%r)' % self,
+            target=DriverPool.run_reaper,
+            args=(weakref.ref(self),)
+        ).start()
+
+    @staticmethod
+    def check_sizes(min_size, max_size):
+        if max_size < max(min_size, 1): raise ValueError(
+            'max_size must be positive and at least min_size.')
+
+    # Changes the given settings of the pool while it is in use. If max_size
+    # is lowered, drivers beyond it are quit as they are released; if min_size
+    # is raised, the reaper spawns more.
+    def configure(self, min_size=None, max_size=None, driver_cache_s=None,
+                  debug=None):
         with self.rlock:
-            if self.destroyed: raise Exception(
-                'This driver pool has been destroyed and is unusable.')
-            if len(self.drivers):
-                driver = self.drivers.pop(0)
-                self.remove_driver_cond.notify_all()
-                if self.debug: driver.log('removed')
-            else:
-                driver = Driver(self)
+            min_size = self.min_size if min_size is None else min_size
+            max_size = self.max_size if max_size is None else max_size
+            self.check_sizes(min_size, max_size)
+            self.min_size, self.max_size = min_size, max_size
+            if driver_cache_s is not None: self.driver_cache_s = driver_cache_s
+            if debug is not None: self.debug = debug
+            self.cond.notify_all()
+
+    # If `url' is given, prefer an idle driver which already has it loaded.
+    def get_driver(self, url=None):
+        start = time.time()
+        while True:
+            with self.rlock:
+                while True:
+                    if self.destroyed: raise Exception(
+                        'This driver pool has been destroyed and is unusable.')
+                    if self.idle:
+                        driver = self.pop_idle(url)
+                        spawn = False
+                        break
+                    if self.live < self.max_size:
+                        self.live += 1
+                        self.misses += 1
+                        spawn = True
+                        break
+                    self.cond.wait()
+            if spawn:
+                driver = self.spawn_driver()
                 if self.debug: driver.log('created and removed')
+                break
+            if self.driver_healthy(driver):
+                with self.rlock:
+                    self.hits += 1
+                    if url is not None and driver.loaded_url == url:
+                        self.url_hits += 1
+                if self.debug: driver.log('removed')
+                break
+            if self.debug: driver.log('failed health check')
+            self.discard_driver(driver)
+
+        wait_s = time.time() - start
+        with self.rlock:
+            self.waits += 1
+            self.wait_s_total += wait_s
+            self.wait_s_max = max(self.wait_s_max, wait_s)
         return driver
 
     def release_driver(self, driver):
         with self.rlock:
-            if self.destroyed: return
-            if self.debug: driver.log('returned')
-            self.drivers.append(driver)
-            threading.Thread(
-                name='DriverPool.destroy_driver(%r)' % driver,
-                target=self.destroy_driver,
-                args=(driver,)
-            ).start()
-
-    def destroy_driver(self, driver):
+            if not self.destroyed and self.live <= self.max_size:
+                if self.debug: driver.log('returned')
+                self.add_idle(driver)
+                return
+        self.discard_driver(driver)
+
+    def pop_idle(self, url=None):
+        with self.rlock:
+            index = -1
+            if url is not None:
+                for i in xrange(len(self.idle)-1, -1, -1):
+                    if self.idle[i].loaded_url == url:
+                        index = i
+                        break
+            driver = self.idle.pop(index)
+            del self.deadlines[driver]
+            return driver
+
+    def add_idle(self, driver):
+        with self.rlock:
+            deadline = time.time() + self.driver_cache_s
+            self.idle.append(driver)
+            self.deadlines[driver] = deadline
+            heapq.heappush(self.expiry,
+                (deadline, next(self.expiry_seq), driver))
+            self.cond.notify_all()
+
+    def spawn_driver(self):
         start = time.time()
-        remain = self.driver_cache_s
+        try:
+            driver = Driver(self)
+        except:
+            with self.rlock:
+                self.live -= 1
+                self.cond.notify_all()
+            raise
+        spawn_s = time.time() - start
         with self.rlock:
-            remove_driver_cond = self.remove_driver_cond
-            while remain > 0:
-                if driver not in self.drivers: return
-                if self.destroyed: break
-                remain = self.driver_cache_s - (time.time() - start)
-                self, driver = weakref.ref(self), weakref.ref(driver)
-                remove_driver_cond.wait(remain)
-                self, driver = self(), driver()
-                if self is None or driver is None: break
-            if self is not None and driver is not None:
-                self.drivers.remove(driver)
-        if driver is not None:
-            if self.debug: driver.log('destroyed')
+            self.spawns += 1
+            self.spawn_s_total += spawn_s
+            self.spawn_s_max = max(self.spawn_s_max, spawn_s)
+        return driver
+
+    def discard_driver(self, driver):
+        with self.rlock:
+            self.live -= 1
+            self.cond.notify_all()
+        if self.debug: driver.log('destroyed')
+        try:
             driver.quit()
+        except Exception:
+            if self.debug: traceback.print_exc()
 
-    def run_pool(self, parent_thread):
-        self = weakref.ref(self)
+    @staticmethod
+    def driver_healthy(driver):
+        try:
+            driver.current_url
+        except (
+            selenium.common.exceptions.WebDriverException,
+            httplib.HTTPException,
+            IOError,
+        ):
+            return False
+        return True
+
+    def stats(self):
+        with self.rlock:
+            lookups = self.hits + self.misses
+            return {
+                'live':             self.live,
+                'idle':             len(self.idle),
+                'hits':             self.hits,
+                'url_hits':         self.url_hits,
+                'misses':           self.misses,
+                'hit_ratio':        float(self.hits)/lookups if lookups else None,
+                'spawns':           self.spawns,
+                'spawn_s_mean':     self.spawn_s_total/self.spawns
+                                    if self.spawns else None,
+                'spawn_s_max':      self.spawn_s_max,
+                'waits':            self.waits,
+                'wait_s_mean':      self.wait_s_total/self.waits
+                                    if self.waits else None,
+                'wait_s_max':       self.wait_s_max}
+
+    # Quits idle drivers whose deadlines have passed, while keeping at least
+    # min_size drivers alive, which are spawned here when the pool starts.
+    @staticmethod
+    def run_reaper(pool_ref):
+        while True:
+            self = pool_ref()
+            if self is None: return
+            expired = []
+            with self.rlock:
+                if self.destroyed: return
+                now = time.time()
+                while self.expiry and self.expiry[0][0] <= now:
+                    deadline, _, driver = heapq.heappop(self.expiry)
+                    if self.deadlines.get(driver) != deadline: continue
+                    if self.live - len(expired) > self.min_size:
+                        self.idle.remove(driver)
+                        del self.deadlines[driver]
+                        expired.append(driver)
+                    else:
+                        self.idle.remove(driver)
+                        self.add_idle(driver)
+                spawn = max(0, self.min_size - self.live + len(expired))
+                self.live += spawn
+            for driver in expired:
+                self.discard_driver(driver)
+            for i in range(spawn):
+                try:
+                    self.add_idle(self.spawn_driver())
+                except Exception:
+                    traceback.print_exc()
+            # Drivers refer to the pool, so none may be kept while waiting.
+            driver = expired = None
+            with self.rlock:
+                if self.destroyed: return
+                timeout = self.driver_cache_s
+                if self.expiry:
+                    timeout = min(timeout, self.expiry[0][0] - time.time())
+                cond, self = self.cond, None
+                if timeout > 0: cond.wait(timeout)
+
+    @staticmethod
+    def run_pool(pool_ref, parent_thread):
         parent_thread.join()
-        self = self()
+        self = pool_ref()
         if self is None: return
+        self.destroy()
+
+    def destroy(self):
         with self.rlock:
+            if self.destroyed: return
             if self.debug: print(
                 '*** Driver pool %x destroyed.' % id(self),
                 file=sys.stderr)
             self.destroyed = True
-            self.remove_driver_cond.notify_all()
+            drivers, self.idle = self.idle, []
+            self.deadlines.clear()
+            del self.expiry[:]
+            self.cond.notify_all()
+        for driver in drivers:
+            self.discard_driver(driver)
 
 pool = DriverPool(debug='--debug' in sys.argv[1:])
 
+# Changes the settings of the shared driver pool; see DriverPool.configure.
+def configure_pool(**kwds):
+    pool.configure(**kwds)
+
 class NameGenerationException(Exception):
     def __init__(self, main_type, url, debug_file, driver, inner_exception):
+        self.inner_exception = inner_exception
         super(NameGenerationException, self).__init__(
         'Error retrieving names of type "%s" from <%s>.%s '
         'Original exception: %r' % (
@@ -114,56 +303,804 @@ class NameGenerationException(Exception):
             if debug_file is not None else '',
             inner_exception))
 
-def random_name(*types):
-    name, subtype = random_name_subtype(*types)
+# Raised when a page loads but is not a name generator, as when it is the
+# site's page for a missing URL.
+class MissingPageError(IOError):
+    pass
+
+# Besides names, records the URL of the generator page of each type, or that
+# no page could be found for the type, with the time that it was found. The
+# database is only opened, and created, when the cache is first used.
+class NameCache(object):
+    __slots__ = 'path', 'connection', 'lock', 'low_water', 'urls'
+
+    def __init__(self, path, low_water=5):
+        self.path = path
+        self.low_water = low_water
+        self.lock = threading.Lock()
+        self.connection = None
+        self.urls = None
+
+    # Returns the connection to the database, opening it if need be. Must be
+    # called with the lock held.
+    def connect(self):
+        if self.connection is not None: return self.connection
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        with connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS names ('
+                'main_type TEXT NOT NULL, subtype TEXT NOT NULL, '
+                'name TEXT NOT NULL, served INTEGER NOT NULL DEFAULT 0, '
+                'PRIMARY KEY (main_type, subtype, name))')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS urls ('
+                'main_type TEXT PRIMARY KEY, url TEXT, found REAL NOT NULL)')
+            self.urls = {main_type: (url, found) for main_type, url, found
+                in connection.execute('SELECT * FROM urls')}
+        self.connection = connection
+        return connection
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None: self.connection.close()
+            self.connection = self.urls = None
+
+    def add(self, main_type, name_subtypes):
+        with self.lock, self.connect():
+            self.connect().executemany(
+                'INSERT OR IGNORE INTO names (main_type, subtype, name) '
+                'VALUES (?, ?, ?)', ((main_type, subtype, name)
+                                     for name, subtype in name_subtypes))
+
+    def fresh_count(self, main_type):
+        with self.lock:
+            (count,), = self.connect().execute(
+                'SELECT COUNT(*) FROM names '
+                'WHERE main_type = ? AND served = 0', (main_type,))
+        return count
+
+    # Returns a random (name, subtype) of the given type which has not yet
+    # been served, and marks it as served; or None if there is no such name.
+    # The name is chosen and marked in one write transaction, so that other
+    # processes using the same database cannot serve it too.
+    def take(self, main_type):
+        with self.lock, self.connect():
+            self.connect().execute('BEGIN IMMEDIATE')
+            (count,), = self.connect().execute(
+                'SELECT COUNT(*) FROM names '
+                'WHERE main_type = ? AND served = 0', (main_type,))
+            if count == 0: return None
+            (rowid, name, subtype), = self.connect().execute(
+                'SELECT rowid, name, subtype FROM names '
+                'WHERE main_type = ? AND served = 0 LIMIT 1 OFFSET ?',
+                (main_type, random.randrange(count)))
+            self.connect().execute(
+                'UPDATE names SET served = served + 1 WHERE rowid = ?',
+                (rowid,))
+        return (name, subtype)
+
+    # Like take, but returns up to `count' distinct names at once.
+    def take_many(self, main_type, count):
+        with self.lock, self.connect():
+            self.connect().execute('BEGIN IMMEDIATE')
+            rows = self.connect().execute(
+                'SELECT rowid, name, subtype FROM names '
+                'WHERE main_type = ? AND served = 0', (main_type,)).fetchall()
+            rows = random.sample(rows, min(count, len(rows)))
+            self.connect().executemany(
+                'UPDATE names SET served = served + 1 WHERE rowid = ?',
+                ((rowid,) for rowid, name, subtype in rows))
+        return [(name, subtype) for rowid, name, subtype in rows]
+
+    def corpus(self):
+        with self.lock:
+            return self.connect().execute(
+                'SELECT main_type, subtype, name FROM names').fetchall()
+
+    def name_count(self):
+        with self.lock:
+            (count,), = self.connect().execute('SELECT COUNT(*) FROM names')
+        return count
+
+    # Returns (url, time found) for the type, where url is None if no page
+    # was found; or None if the type has not been looked up.
+    def url(self, main_type):
+        with self.lock:
+            self.connect()
+            return self.urls.get(main_type)
+
+    # Returns up to `count' random names of the type, whether or not they have
+    # been served.
+    def sample(self, main_type, count):
+        with self.lock:
+            return self.connect().execute(
+                'SELECT name, subtype FROM names WHERE main_type = ? '
+                'ORDER BY RANDOM() LIMIT ?', (main_type, count)).fetchall()
+
+    def set_url(self, main_type, url):
+        with self.lock, self.connect():
+            self.urls[main_type] = (url, time.time())
+            self.connect().execute(
+                'INSERT OR REPLACE INTO urls (main_type, url, found) '
+                'VALUES (?, ?, ?)', (main_type,) + self.urls[main_type])
+
+cache = NameCache('fantasynamegenerators.cache.db')
+
+# Makes names be cached in the database at `path', closing the current one.
+def set_cache_path(path):
+    global cache
+    old_cache, cache = cache, NameCache(path)
+    old_cache.close()
+
+# After `threshold' consecutive failures to fetch names of a type, fetching
+# that type fails at once for a backoff period, which doubles each time a
+# single trial fetch after it fails again, up to max_backoff_s, and is jittered
+# so that types and processes do not all retry together.
+class CircuitBreakers(object):
+    __slots__ = ('threshold', 'backoff_s', 'max_backoff_s', 'failures',
+                 'opens', 'retry_at', 'trials', 'lock', 'rng')
+
+    def __init__(self, threshold=3, backoff_s=10, max_backoff_s=600):
+        self.threshold = threshold
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.failures = collections.Counter()
+        self.opens = collections.Counter()
+        self.retry_at = {}
+        self.trials = set()
+        self.lock = threading.Lock()
+        self.rng = random.Random()
+
+    def is_open(self, main_type):
+        with self.lock:
+            return self._is_open(main_type)
+
+    def _is_open(self, main_type):
+        retry_at = self.retry_at.get(main_type)
+        return retry_at is not None and (
+            time.time() < retry_at or main_type in self.trials)
+
+    # Raises NameGenerationException if the type's circuit is open; otherwise
+    # the caller may fetch it, as the single trial if the backoff has passed.
+    def check(self, main_type):
+        with self.lock:
+            if self._is_open(main_type): raise NameGenerationException(
+                main_type, base_url, None, None, IOError(
+                    'Fetching failed %d times; not retrying for %.0f s.' % (
+                    self.failures[main_type],
+                    max(0, self.retry_at[main_type] - time.time()))))
+            if main_type in self.retry_at:
+                self.trials.add(main_type)
+
+    def success(self, main_type):
+        with self.lock:
+            del self.failures[main_type], self.opens[main_type]
+            self.retry_at.pop(main_type, None)
+            self.trials.discard(main_type)
+
+    # Called if a fetch is abandoned without succeeding or failing, as when it
+    # is interrupted, so that another trial may be made.
+    def cancel_trial(self, main_type):
+        with self.lock:
+            self.trials.discard(main_type)
+
+    def failure(self, main_type):
+        with self.lock:
+            self.failures[main_type] += 1
+            self.trials.discard(main_type)
+            if self.failures[main_type] >= self.threshold:
+                self.opens[main_type] += 1
+                backoff_s = min(self.max_backoff_s,
+                    self.backoff_s * 2**(self.opens[main_type] - 1))
+                self.retry_at[main_type] = \
+                    time.time() + backoff_s * self.rng.uniform(0.5, 1.5)
+
+breakers = CircuitBreakers()
+
+class NamePrefetcher(object):
+    __slots__ = ('fetch', 'queues', 'filling', 'fetching', 'waiting', 'errors',
+                 'callbacks', 'lock', 'cond', 'low_water', 'high_water',
+                 'num_workers', 'workers', 'stopped', 'debug', '__weakref__')
+
+    def __init__(self, fetch, workers=2, low_water=2, high_water=8,
+                 debug=False):
+        self.fetch = fetch
+        self.queues = {}
+        self.filling = set()
+        self.fetching = collections.Counter()
+        self.waiting = collections.Counter()
+        self.errors = {}
+        self.callbacks = collections.defaultdict(collections.deque)
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.low_water = low_water
+        self.high_water = high_water
+        self.num_workers = workers
+        self.workers = []
+        self.stopped = False
+        self.debug = debug
+
+        threading.Thread(
+            name='NamePrefetcher.run_prefetcher(%r)' % self,
+            target=self.run_prefetcher,
+            args=(threading.current_thread(),)
+        ).start()
+
+    def want(self, *types):
+        with self.lock:
+            for main_type in types:
+                self._update_filling(main_type)
+            self._start_workers()
+
+    # If `timeout' is given, returns None if no name is ready after that many
+    # seconds, rather than waiting or fetching one itself. If fetching the type
+    # fails, the error is raised in every caller waiting for it, and is kept
+    # for the next caller if none is.
+    def take(self, main_type, timeout=None):
+        if not self.num_workers or self.stopped:
+            return self.fetch(main_type) if timeout is None else None
+        end = None if timeout is None else time.time() + timeout
+        with self.lock:
+            queue = self._update_filling(main_type)
+            self._start_workers()
+            self.waiting[main_type] += 1
+            try:
+                while not queue and not self.stopped:
+                    if main_type in self.errors:
+                        exc_info = self.errors[main_type]
+                        raise exc_info[0], exc_info[1], exc_info[2]
+                    if end is None:
+                        self.cond.wait()
+                    elif end > time.time():
+                        self.cond.wait(end - time.time())
+                    else:
+                        break
+            finally:
+                self.waiting[main_type] -= 1
+                if not self.waiting[main_type]:
+                    self.errors.pop(main_type, None)
+            if not queue:
+                name_subtype = None
+            else:
+                name_subtype = queue.popleft()
+                self.errors.pop(main_type, None)
+                self._update_filling(main_type)
+        if name_subtype is None and timeout is None:
+            return self.fetch(main_type)
+        return name_subtype
+
+    # Calls `callback(name_subtype, None)' with the next name of the type, or
+    # `callback(None, exc_info)' if it cannot be fetched, without blocking: the
+    # callback is called either now or from a worker thread.
+    def take_async(self, main_type, callback):
+        name_subtype = exc_info = None
+        with self.lock:
+            queue = self._update_filling(main_type)
+            if queue:
+                name_subtype = queue.popleft()
+                self._update_filling(main_type)
+            elif main_type in self.errors:
+                exc_info = self.errors[main_type]
+                if not self.waiting[main_type]: del self.errors[main_type]
+            elif self.stopped or not self.num_workers:
+                exc_info = stopped_exc_info(main_type)
+            else:
+                self._start_workers()
+                self.callbacks[main_type].append(callback)
+                self.waiting[main_type] += 1
+                return
+        callback(name_subtype, exc_info)
+
+    # Returns up to `count' names which are ready, without waiting for more.
+    def take_ready(self, main_type, count):
+        with self.lock:
+            queue = self._update_filling(main_type)
+            name_subtypes = [queue.popleft()
+                             for i in xrange(min(count, len(queue)))]
+            self._update_filling(main_type)
+        return name_subtypes
+
+    def level(self, main_type):
+        return len(self.queues[main_type]) + self.fetching[main_type]
+
+    def _update_filling(self, main_type):
+        queue = self.queues.get(main_type)
+        if queue is None:
+            queue = self.queues[main_type] = collections.deque()
+        level = self.level(main_type)
+        if level < self.low_water:
+            if main_type not in self.filling:
+                self.filling.add(main_type)
+                self.cond.notify_all()
+        elif level >= self.high_water:
+            self.filling.discard(main_type)
+        return queue
+
+    # Types with callers blocked on them come first, then those with the
+    # fewest names ready or in progress.
+    def _next_type(self):
+        candidates = [t for t in self.filling if t not in self.errors
+                      and self.level(t) < self.high_water]
+        if not candidates: return None
+        return min(candidates, key=lambda t: (-self.waiting[t], self.level(t)))
+
+    def _start_workers(self):
+        while not self.stopped and len(self.workers) < self.num_workers:
+            worker = threading.Thread(
+                name='NamePrefetcher.run_worker(%r)' % self,
+                target=self.run_worker)
+            worker.start()
+            self.workers.append(worker)
+
+    def run_worker(self):
+        while True:
+            with self.lock:
+                main_type = self._next_type()
+                while main_type is None and not self.stopped:
+                    self.cond.wait()
+                    main_type = self._next_type()
+                if self.stopped: return
+                self.fetching[main_type] += 1
+            try:
+                name_subtype = self.fetch(main_type)
+            except Exception:
+                exc_info = sys.exc_info()
+                if self.debug: traceback.print_exception(*exc_info)
+                with self.lock:
+                    self.fetching[main_type] -= 1
+                    callbacks = self.pop_callbacks(main_type)
+                    if self.waiting[main_type] or not callbacks:
+                        self.errors[main_type] = exc_info
+                    self.filling.discard(main_type)
+                    self.cond.notify_all()
+                for callback in callbacks:
+                    callback(None, exc_info)
+            else:
+                with self.lock:
+                    self.fetching[main_type] -= 1
+                    callbacks = self.callbacks.get(main_type)
+                    if callbacks:
+                        callback = callbacks.popleft()
+                        self.waiting[main_type] -= 1
+                    else:
+                        callback = None
+                        self.queues[main_type].append(name_subtype)
+                    self._update_filling(main_type)
+                    self.cond.notify_all()
+                if callback is not None:
+                    callback(name_subtype, None)
+
+    def run_prefetcher(self, parent_thread):
+        self = weakref.ref(self)
+        parent_thread.join()
+        self = self()
+        if self is None: return
+        self.stop()
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            self.cond.notify_all()
+            callbacks = [(main_type, self.pop_callbacks(main_type))
+                         for main_type in self.callbacks.keys()]
+        for main_type, type_callbacks in callbacks:
+            for callback in type_callbacks:
+                callback(None, stopped_exc_info(main_type))
+
+    def pop_callbacks(self, main_type):
+        callbacks = self.callbacks.pop(main_type, ())
+        self.waiting[main_type] -= len(callbacks)
+        return callbacks
+
+def stopped_exc_info(main_type):
+    return (NameGenerationException, NameGenerationException(
+        main_type, base_url, None, None,
+        IOError('The name prefetcher has stopped.')), None)
+
+prefetcher = NamePrefetcher(
+    lambda main_type: cached_name_subtype(main_type),
+    debug='--debug' in sys.argv[1:])
+
+# Generates names offline from n-gram models trained on the name cache. The
+# models are saved to `path' when trained, and loaded from it thereafter unless
+# the cache has gained or lost names since, when they are trained again. By
+# default, `path' is beside the cache in use, with the extension .markov, and
+# models are loaded again when the cache is replaced. If the cache has no
+# names, there are no models, and a warning is given.
+class MarkovBackend(object):
+    __slots__ = 'path', 'models', 'cache', 'lock'
+
+    def __init__(self, path=None):
+        self.path = path
+        self.models = None
+        self.cache = None
+        self.lock = threading.RLock()
+
+    def name_subtype(self, main_type, rng=random, deadline=None):
+        return self.get_models().name_subtype(main_type, rng)
+
+    def name_subtypes(self, main_type, seeds, deadline=None):
+        models = self.get_models()
+        return [models.name_subtype(main_type, random.Random(seed))
+                for seed in seeds]
+
+    def prefetch(self, *types):
+        pass
+
+    # The path of the models of the given name cache.
+    def models_path(self, cache):
+        if self.path is not None: return self.path
+        return os.path.splitext(cache.path)[0] + '.markov'
+
+    def get_models(self):
+        with self.lock:
+            current_cache = cache
+            if self.models is None or self.cache is not current_cache:
+                try:
+                    models = markov.NameModels.load(
+                        self.models_path(current_cache))
+                except (IOError, EOFError, ValueError):
+                    models = None
+                if models is None or \
+                   models.corpus_size != current_cache.name_count():
+                    try:
+                        self.train(current_cache)
+                    except LookupError as e:
+                        warnings.warn('The Markov name backend cannot '
+                            'generate names: %s Fetch some names from the web '
+                            'first.' % e, RuntimeWarning)
+                        raise
+                else:
+                    self.models, self.cache = models, current_cache
+            return self.models
+
+    def train(self, name_cache=None, order=3):
+        with self.lock:
+            if name_cache is None: name_cache = cache
+            models = markov.NameModels.train(name_cache.corpus(), order)
+            models.save(self.models_path(name_cache))
+            self.models, self.cache = models, name_cache
+
+# Fetches names from fantasynamegenerators.com, by way of the prefetcher and
+# the name cache. If a deadline is given, names are never fetched directly:
+# names ready in the prefetcher are used first, then unserved names in the
+# cache, and the prefetcher is only waited for, one name at a time, for any
+# still missing while there is time left for a fetch; this may give fewer
+# names than were asked for.
+class WebBackend(object):
+    __slots__ = ()
+
+    def name_subtype(self, main_type, rng=random, deadline=None):
+        if deadline is not None:
+            name_subtypes = self.name_subtypes(main_type, [None], deadline)
+            if not name_subtypes: raise NameGenerationException(
+                main_type, base_url, None, None,
+                IOError('No names were ready before the deadline.'))
+            return name_subtypes[0]
+        return prefetcher.take(main_type)
+
+    def name_subtypes(self, main_type, seeds, deadline=None):
+        count = len(seeds)
+        if deadline is not None:
+            name_subtypes = prefetcher.take_ready(main_type, count)
+            if len(name_subtypes) < count:
+                name_subtypes.extend(
+                    cache.take_many(main_type, count - len(name_subtypes)))
+            while len(name_subtypes) < count:
+                remaining = deadline - time.time()
+                if remaining < fetch_s_estimate: break
+                name_subtype = prefetcher.take(main_type, remaining)
+                if name_subtype is None: break
+                name_subtypes.append(name_subtype)
+            return name_subtypes
+        if count == 1:
+            return [prefetcher.take(main_type)]
+        name_subtypes = prefetcher.take_ready(main_type, count)
+        if len(name_subtypes) < count:
+            name_subtypes.extend(
+                cached_name_subtypes(main_type, count - len(name_subtypes)))
+        return name_subtypes
+
+    def prefetch(self, *types):
+        prefetcher.want(*types)
+
+backends = {
+    'web':      WebBackend(),
+    'markov':   MarkovBackend(),
+}
+backend = 'markov' if '--markov-names' in sys.argv[1:] else 'web'
+
+def set_backend(name):
+    global backend
+    if name not in backends: raise ValueError(
+        'Unknown name backend "%s"; must be one of: %s.'
+        % (name, ', '.join(sorted(backends))))
+    backend = name
+
+# Stops the prefetcher and quits all browsers. This happens anyway when the
+# main thread exits, but not in processes that exit without joining threads.
+def shutdown():
+    prefetcher.stop()
+    pool.destroy()
+
+def prefetch_names(*types):
+    backends[backend].prefetch(*types)
+
+# Collects requests for names so that they can be fetched together, with all
+# the names of each type fetched at once. If the plan has a deadline (a value
+# of time.time()), it is resolved by then, with cached or offline names if
+# need be.
+class NamePlan(object):
+    __slots__ = 'requests', 'deadline'
+
+    def __init__(self, deadline=None):
+        self.requests = []
+        self.deadline = deadline
+
+    # Arranges for `callback(name, subtype)' to be called with a name of one of
+    # the given types when the plan is resolved. The type, and the seed with
+    # which offline backends generate the name, are drawn from `rng' now, so
+    # that the name does not depend on what else is in the plan.
+    def request(self, types, callback, rng=random):
+        self.requests.append(
+            (rng.choice(types), callback, rng.getrandbits(64), types))
+
+    # Calls the callbacks in the order that they were requested, including
+    # those requested by other callbacks during resolution.
+    def resolve(self):
+        while self.requests:
+            requests, seeds, types = self.take_requests()
+            self.deliver(requests, {t: with_fallbacks(t, types[t], len(s),
+                lambda t2, n: backends[backend].name_subtypes(
+                    t2, s[len(s)-n:], self.deadline))
+                for t, s in seeds.iteritems()})
+
+    # Removes the pending requests and returns them, with the seeds of the
+    # requests of each type and the other types that they could have been.
+    def take_requests(self):
+        requests, self.requests = self.requests, []
+        seeds = collections.defaultdict(list)
+        types = collections.defaultdict(list)
+        for main_type, callback, seed, request_types in requests:
+            seeds[main_type].append(seed)
+            types[main_type].extend(t for t in request_types
+                                    if t not in types[main_type])
+        return requests, seeds, types
+
+    # Calls the callbacks of `requests' with the names in the list of each
+    # type in `names'.
+    @staticmethod
+    def deliver(requests, names):
+        names = {t: iter(n) for t, n in names.iteritems()}
+        for main_type, callback, seed, request_types in requests:
+            callback(*next(names[main_type]))
+
+def random_name(*types, **kwds):
+    name, subtype = random_name_subtype(*types, **kwds)
     return name
 
-def random_name_gender(*types):
-    (name, subtype) = random_name_subtype(*types)
+def random_name_gender(*types, **kwds):
+    (name, subtype) = random_name_subtype(*types, **kwds)
+    return (name, subtype_gender(subtype))
+
+# Coroutine versions of the above, for dwchargen.aio's event loop.
+def random_name_async(*types, **kwds):
+    import aio
+    return aio.random_name(*types, **kwds)
+
+def random_name_gender_async(*types, **kwds):
+    import aio
+    return aio.random_name_gender(*types, **kwds)
+
+def random_name_subtype_async(*types, **kwds):
+    import aio
+    return aio.random_name_subtype(*types, **kwds)
+
+def subtype_gender(subtype):
     if subtype == 'amazon':
         subtype = 'female'
     if subtype not in ('male', 'female'):
         subtype = None
-    return (name, subtype)
+    return subtype
+
+# If `deadline' is given, returns by then, with a cached or offline name if
+# need be.
+def random_name_subtype(*types, **kwds):
+    rng = kwds.get('rng', random)
+    deadline = kwds.get('deadline')
+    name_subtype, = with_fallbacks(rng.choice(types), types, 1,
+        lambda main_type, count: [
+            backends[backend].name_subtype(main_type, rng, deadline)])
+    return name_subtype
+
+# The types tried in turn when not enough names of a type can be had: the
+# other types that the name could have been, then fallbacks[main_type], then
+# default_fallbacks, skipping those whose circuits are open. `get_names(type,
+# count)' returns up to `count' names of a type. If the names are still short,
+# names of these types already in the name cache are reused, or, failing that,
+# generated by the Markov backend.
+fallbacks = {}
+default_fallbacks = ['alien']
+
+def with_fallbacks(main_type, types, count, get_names):
+    chain = []
+    for t in itertools.chain([main_type], types, fallbacks.get(main_type, ()),
+                             default_fallbacks):
+        if t not in chain: chain.append(t)
+    name_subtypes, exc_info = [], None
+    for t in chain:
+        if len(name_subtypes) == count: return name_subtypes
+        if breakers.is_open(t): continue
+        try:
+            name_subtypes.extend(get_names(t, count - len(name_subtypes)))
+        except Exception:
+            if exc_info is None: exc_info = sys.exc_info()
+    if len(name_subtypes) == count: return name_subtypes
+    missing = count - len(name_subtypes)
+    for t in chain:
+        sample = cache.sample(t, missing)
+        if sample:
+            return name_subtypes + [sample[i % len(sample)]
+                                    for i in xrange(missing)]
+    for t in chain:
+        try:
+            return name_subtypes + [backends['markov'].name_subtype(t)
+                                    for i in xrange(missing)]
+        except LookupError:
+            pass
+    if exc_info is None:
+        exc_info = (NameGenerationException(main_type, base_url, None, None,
+            IOError('Not enough names of these types could be had.')),
+            None, None)
+    raise exc_info[0], exc_info[1], exc_info[2]
+
+def cached_name_subtype(main_type):
+    if cache.fresh_count(main_type) >= cache.low_water:
+        name_subtype = cache.take(main_type)
+        if name_subtype is not None: return name_subtype
+    name_subtypes = fetch_names(main_type)
+    cache.add(main_type, name_subtypes)
+    return cache.take(main_type) or random.choice(name_subtypes)
+
+def cached_name_subtypes(main_type, count):
+    name_subtypes = cache.take_many(main_type, count)
+    while len(name_subtypes) < count:
+        fetched = fetch_names(main_type)
+        cache.add(main_type, fetched)
+        more = cache.take_many(main_type, count - len(name_subtypes))
+        if not more:
+            more = [random.choice(fetched)
+                    for i in xrange(count - len(name_subtypes))]
+        name_subtypes.extend(more)
+    return name_subtypes
+
+# The site that names are fetched from, which may be replaced by a local copy
+# of its pages, as in tools/bench_dg.py.
+base_url = 'http://fantasynamegenerators.com/'
+
+# How long a type for which no page was found is failed without trying again.
+missing_url_retry_s = 3600
+
+# A moving average of the time taken by fetch_names, by which deadlines are
+# judged to leave time for a fetch or not.
+fetch_s_estimate = 5.0
+
+def fetch_names(main_type):
+    global fetch_s_estimate
+    breakers.check(main_type)
+    start = time.time()
+    try:
+        name_subtypes = fetch_page_names(main_type)
+    except NameGenerationException:
+        breakers.failure(main_type)
+        raise
+    except Exception as e:
+        # Such as a failure to start a driver.
+        breakers.failure(main_type)
+        raise NameGenerationException(main_type, base_url, None, None, e), \
+              None, sys.exc_info()[2]
+    except:
+        breakers.cancel_trial(main_type)
+        raise
+    breakers.success(main_type)
+    fetch_s_estimate += 0.2 * (time.time() - start - fetch_s_estimate)
+    return name_subtypes
+
+# The URL of a type's page is found by trying each separator in turn, and is
+# kept in the name cache. If the page stops working, the others are tried again
+# before giving up; if every URL loads a page which is not a name generator,
+# the type fails immediately until missing_url_retry_s has passed. Other
+# failures, such as timeouts, are not remembered.
+def fetch_page_names(main_type):
+    known = cache.url(main_type)
+    if known is not None:
+        url, found = known
+        if url is None and time.time() - found < missing_url_retry_s:
+            raise NameGenerationException(main_type, base_url, None, None,
+                LookupError('No page was found for this type at %s.'
+                            % time.ctime(found)))
+    urls = ['%s%s%snames.php' % (base_url,
+            re.sub(r' ', separator, main_type.lower()), separator)
+            for separator in '-', '_']
+    if known is not None and known[0] in urls:
+        urls.remove(known[0])
+        urls.insert(0, known[0])
 
-def random_name_subtype(*types):
-    main_type = random.choice(types)
     exceptions = []
-    for separator in '-', '_':
+    for url in urls:
         try:
-            return _random_name_subtype(
-                'http://fantasynamegenerators.com/%s%snames.php'
-                % (re.sub(r' ', separator, main_type.lower()), separator), main_type)
+            name_subtypes = _fetch_names(url, main_type)
         except NameGenerationException as e:
             e.traceback = sys.exc_info()[2]
             exceptions.append(e)
+        else:
+            if known is None or known[0] != url:
+                cache.set_url(main_type, url)
+            return name_subtypes
+    if (known is None or known[0] is None) and all(
+        isinstance(e.inner_exception, MissingPageError) for e in exceptions):
+        cache.set_url(main_type, None)
     for exception in exceptions[:-1]:
         traceback.print_exception(exception, None, exception.traceback)
     raise exceptions[-1], None, exceptions[-1].traceback
 
-def _random_name_subtype(url, main_type):
-    with pool.get_driver() as phantomJS:
+# When positive, each page load is followed by this many clicks of the
+# generator buttons in a single script execution, and the page is left open so
+# that the driver can be reused for the same URL without loading it again.
+bulk_rounds = 0 if '--no-bulk-names' in sys.argv[1:] else 25
+
+BULK_SCRIPT = """
+    var rounds = arguments[0], results = [];
+    var buttons = document.getElementById('nameGen')
+                          .getElementsByTagName('input');
+    for (var i = 0; i < rounds; i++) {
+        var button = buttons[Math.floor(Math.random() * buttons.length)];
+        button.click();
+        var names = document.getElementById('result').innerText
+                            .split(/[\\r\\n]+/);
+        for (var j = 0; j < names.length; j++)
+            results.push([names[j], button.value]);
+    }
+    return results;
+"""
+
+def _fetch_names(url, main_type):
+    with pool.get_driver(url if bulk_rounds else None) as phantomJS:
         try:
             phantomJS.implicitly_wait(0.5)
-            phantomJS.get(url)
-    
-            nameGen = phantomJS.find_element_by_id('nameGen')
-            buttons = nameGen.find_elements_by_tag_name('input')
-            button = random.choice(buttons)
-            subtype = button.get_attribute('value').lower()
-            subtype = re.sub(r'(^get )(.*)( names$)', r'\2', subtype)
-            button.click()
-
-            names = phantomJS.find_element_by_id('result').text
-            names = [name.strip() for name in re.split(r'[\r\n]+', names)]
-            names = [string.capwords(name) for name in names if name]
-            
-            return (random.choice(names), subtype)
+            if not bulk_rounds or phantomJS.loaded_url != url:
+                phantomJS.loaded_url = None
+                phantomJS.get(url)
+                if not phantomJS.find_elements_by_id('nameGen'):
+                    raise MissingPageError('The page has no name generator.')
+                phantomJS.loaded_url = url
+
+            if bulk_rounds:
+                results = phantomJS.execute_script(BULK_SCRIPT, bulk_rounds)
+            else:
+                nameGen = phantomJS.find_element_by_id('nameGen')
+                buttons = nameGen.find_elements_by_tag_name('input')
+                button = random.choice(buttons)
+                subtype = button.get_attribute('value')
+                button.click()
+                names = phantomJS.find_element_by_id('result').text
+                results = [(name, subtype)
+                           for name in re.split(r'[\r\n]+', names)]
+
+            name_subtypes = []
+            for name, subtype in results:
+                name = string.capwords(name.strip())
+                subtype = re.sub(
+                    r'(^get )(.*)( names$)', r'\2', subtype.lower())
+                if name: name_subtypes.append((name, subtype))
+            if not name_subtypes: raise IOError('No names were generated.')
+            return name_subtypes
         except (
             selenium.common.exceptions.WebDriverException,
             httplib.HTTPException,
             IOError,
         ) as exc:
+            phantomJS.loaded_url = None
             exc_traceback = sys.exc_info()[2]
             try:
                 debug_file = 'fantasynamegenerators.error.htm'
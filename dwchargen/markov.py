@@ -0,0 +1,112 @@
+import collections
+import marshal
+import random
+import bisect
+
+START, END = u'\x02', u'\x03'
+
+#-------------------------------------------------------------------------------
+# A character-level n-gram model of a list of names. Each context of `order'
+# characters maps to the characters that may follow it and their cumulative
+# frequencies, so that each character is sampled with one binary search.
+class NameModel(object):
+    __slots__ = 'order', 'table'
+
+    def __init__(self, order, table):
+        self.order = order
+        self.table = table
+
+    @classmethod
+    def train(cls, names, order=3):
+        counts = collections.defaultdict(collections.Counter)
+        for name in names:
+            padded = START*order + name + END
+            for i in xrange(order, len(padded)):
+                counts[padded[i-order:i]][padded[i]] += 1
+        table = {}
+        for context, following in counts.iteritems():
+            chars, cumulative, total = [], [], 0
+            for char, count in following.iteritems():
+                total += count
+                chars.append(char)
+                cumulative.append(total)
+            table[context] = (u''.join(chars), tuple(cumulative))
+        return cls(order, table)
+
+    def generate(self, rng=random, max_length=32):
+        table = self.table
+        context = START*self.order
+        chars = []
+        while len(chars) < max_length:
+            following, cumulative = table[context]
+            char = following[bisect.bisect_right(
+                cumulative, rng.random() * cumulative[-1])]
+            if char == END: break
+            chars.append(char)
+            context = context[1:] + char
+        return u''.join(chars)
+
+#-------------------------------------------------------------------------------
+# A NameModel for each (main_type, subtype), with the subtypes of each main
+# type weighted by the number of names they were trained on. `corpus_size' is
+# the number of names in the corpus, so that models can tell when the corpus
+# has changed since they were trained.
+class NameModels(object):
+    __slots__ = 'models', 'subtypes', 'corpus_size'
+    version = 2
+
+    def __init__(self, corpus_size=0):
+        self.models = {}
+        self.subtypes = {}
+        self.corpus_size = corpus_size
+
+    @classmethod
+    def train(cls, corpus, order=3):
+        names = collections.defaultdict(list)
+        for main_type, subtype, name in corpus:
+            names[main_type, subtype].append(name)
+        if not names: raise LookupError('There are no names to train on.')
+        self = cls(sum(len(type_names) for type_names in names.itervalues()))
+        for (main_type, subtype), type_names in names.iteritems():
+            self.add(main_type, subtype, len(type_names),
+                     NameModel.train(type_names, order))
+        return self
+
+    def add(self, main_type, subtype, weight, model):
+        self.models[main_type, subtype] = model
+        subtypes, cumulative = self.subtypes.get(main_type, ((), ()))
+        self.subtypes[main_type] = (
+            subtypes + (subtype,),
+            cumulative + ((cumulative[-1] if cumulative else 0) + weight,))
+
+    def name_subtype(self, main_type, rng=random):
+        if main_type not in self.subtypes: raise LookupError(
+            'No names of type "%s" are available to train on.' % main_type)
+        subtypes, cumulative = self.subtypes[main_type]
+        subtype = subtypes[bisect.bisect_right(
+            cumulative, rng.random() * cumulative[-1])]
+        name = self.models[main_type, subtype].generate(rng)
+        return (name, subtype)
+
+    def save(self, path):
+        records = []
+        for main_type, (subtypes, cumulative) in self.subtypes.iteritems():
+            for i, subtype in enumerate(subtypes):
+                model = self.models[main_type, subtype]
+                weight = cumulative[i] - (cumulative[i-1] if i else 0)
+                records.append(
+                    (main_type, subtype, weight, model.order, model.table))
+        with open(path, 'wb') as file:
+            marshal.dump((self.version, self.corpus_size, records), file)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            data = marshal.load(file)
+        if data[0] != cls.version: raise ValueError(
+            '%s has version %r, not %r.' % (path, data[0], cls.version))
+        version, corpus_size, records = data
+        self = cls(corpus_size)
+        for main_type, subtype, weight, order, table in records:
+            self.add(main_type, subtype, weight, NameModel(order, table))
+        return self
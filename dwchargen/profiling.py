@@ -0,0 +1,227 @@
+#===============================================================================
+# Timing of the phases of character generation and name fetching. While the
+# profiler is installed, the functions of each phase are replaced by wrappers
+# that time them; when it is uninstalled, the original functions are put back,
+# so that profiling costs nothing when it is not in use.
+#
+# The phases are:
+#   char          Char.set_random
+#   abilities     Abilities.new_random
+#   class         Class.new_random
+#   race          Race.new_random
+#   apply         the apply methods of classes and races
+#   apply_random  the apply_random methods of classes and races
+#   names         NamePlan.resolve, including any wait for names
+#   wait          NamePrefetcher.take, waiting for the prefetcher's workers to
+#                 fetch a name that was not ready
+#   fetch         fetch_names, one page of names from the web
+#   page_load     loading a page in a browser driver
+#   spawn         starting a browser driver
+#
+# Calls to a phase made during another call to the same phase, as by
+# Move_Shifter's second race or a method calling its superclass's, are part of
+# the outer call. The seconds that each character's thread spent waiting for
+# names to be fetched while generating it, either for the prefetcher or for a
+# fetch of its own, are recorded as `name_wait_per_char'; names resolved later,
+# as by generate_batch, are not counted.
+#===============================================================================
+import collections
+import threading
+import functools
+import random
+import json
+import time
+
+import fantasynamegenerators as fantasy
+import dungeon_galaxy as galaxy
+import dungeon_world_base as base
+
+# A sample of at most `size' of the values added to it, chosen uniformly, with
+# the number and sum of all of them.
+class Series(object):
+    __slots__ = 'size', 'count', 'sum', 'max', 'samples', 'rng'
+
+    def __init__(self, size=10000):
+        self.size = size
+        self.count = 0
+        self.sum = 0
+        self.max = None
+        self.samples = []
+        self.rng = random.Random(0)
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+        else:
+            i = self.rng.randrange(self.count)
+            if i < self.size: self.samples[i] = value
+
+    # The nearest-rank percentiles of the sample.
+    def percentiles(self, *ps):
+        samples = sorted(self.samples)
+        if not samples: return [None for p in ps]
+        return [samples[max(0, -(-len(samples) * p // 100) - 1)] for p in ps]
+
+    def stats(self):
+        p50, p90, p99 = self.percentiles(50, 90, 99)
+        return collections.OrderedDict([
+            ('count',   self.count),
+            ('sum',     self.sum),
+            ('mean',    float(self.sum) / self.count if self.count else None),
+            ('p50',     p50),
+            ('p90',     p90),
+            ('p99',     p99),
+            ('max',     self.max)])
+
+#-------------------------------------------------------------------------------
+class Profiler(object):
+    def __init__(self, sample_size=10000):
+        self.sample_size = sample_size
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.series = {}
+        # (owner, attribute, original value or None if it was inherited).
+        self.patches = []
+
+    # The (phase, owner, attribute) of each function to be timed.
+    @staticmethod
+    def targets():
+        yield 'char', galaxy.Char, 'set_random'
+        yield 'abilities', galaxy.Abilities, 'new_random'
+        yield 'class', galaxy.Class, 'new_random'
+        yield 'race', galaxy.Race, 'new_random'
+        classes = set()
+        for root in galaxy.Class, galaxy.Race:
+            for cls in subclasses(root):
+                classes.update(cls.__mro__)
+        for cls in classes:
+            for attr in 'apply', 'apply_random':
+                if attr in cls.__dict__:
+                    yield attr, cls, attr
+        yield 'names', fantasy.NamePlan, 'resolve'
+        yield 'wait', fantasy.NamePrefetcher, 'take'
+        yield 'fetch', fantasy, 'fetch_names'
+        yield 'page_load', fantasy.Driver, 'get'
+        yield 'spawn', fantasy.DriverPool, 'spawn_driver'
+
+    def installed(self):
+        return bool(self.patches)
+
+    def install(self):
+        if self.patches: return
+        for phase, owner, attr in self.targets():
+            own = attr in vars(owner)
+            value = vars(owner)[attr] if own else inherited(owner, attr)
+            setattr(owner, attr, self.wrap_value(phase, value))
+            self.patches.append((owner, attr, value if own else None))
+
+    def uninstall(self):
+        while self.patches:
+            owner, attr, value = self.patches.pop()
+            if value is None:
+                delattr(owner, attr)
+            else:
+                setattr(owner, attr, value)
+
+    def reset(self):
+        with self.lock:
+            self.series.clear()
+
+    def wrap_value(self, phase, value):
+        if isinstance(value, classmethod):
+            return classmethod(self.wrap(phase, value.__func__))
+        if isinstance(value, staticmethod):
+            return staticmethod(self.wrap(phase, value.__func__))
+        return self.wrap(phase, value)
+
+    def wrap(self, phase, function):
+        local, record = self.local, self.record
+        @functools.wraps(function)
+        def wrapper(*args, **kwds):
+            active = local.__dict__.setdefault('active', set())
+            if phase in active:
+                return function(*args, **kwds)
+            # A fetch made by a waiting take() is part of the wait.
+            waiting = phase == 'wait' or \
+                      phase == 'fetch' and 'wait' not in active
+            active.add(phase)
+            if phase == 'char':
+                local.name_wait = 0.0
+            start = time.time()
+            try:
+                return function(*args, **kwds)
+            finally:
+                elapsed = time.time() - start
+                record(phase, elapsed)
+                active.discard(phase)
+                if waiting and getattr(local, 'name_wait', None) is not None:
+                    local.name_wait += elapsed
+                if phase == 'char':
+                    record('name_wait_per_char', local.name_wait)
+                    local.name_wait = None
+        return wrapper
+
+    def record(self, name, value):
+        with self.lock:
+            series = self.series.get(name)
+            if series is None:
+                series = self.series[name] = Series(self.sample_size)
+            series.add(value)
+
+    def stats(self):
+        with self.lock:
+            return collections.OrderedDict(
+                (name, self.series[name].stats())
+                for name in sorted(self.series))
+
+    def to_json(self):
+        return json.dumps(self.stats())
+
+    # Prometheus's text exposition format: a summary of the seconds taken by
+    # each phase, and of the seconds spent waiting for names per character.
+    def to_prometheus(self):
+        lines = []
+        stats = self.stats()
+        name_wait = stats.pop('name_wait_per_char', None)
+        for metric, help, series in (
+            ('dwchargen_phase_seconds',
+             'Time taken by each phase of character generation.', stats),
+            ('dwchargen_name_wait_seconds_per_char',
+             'Time spent waiting for names to be fetched while generating '
+             'each character.',
+             {None: name_wait} if name_wait else {})):
+            lines.append('# HELP %s %s' % (metric, help))
+            lines.append('# TYPE %s summary' % metric)
+            for name, s in series.iteritems():
+                label = 'phase="%s",' % name if name is not None else ''
+                for q in 'p50', 'p90', 'p99':
+                    if s[q] is not None:
+                        lines.append('%s{%squantile="0.%s"} %r' % (
+                            metric, label, q[1:], s[q]))
+                label = '{%s}' % label.rstrip(',') if label else ''
+                lines.append('%s_sum%s %r' % (metric, label, s['sum']))
+                lines.append('%s_count%s %d' % (metric, label, s['count']))
+        return '\n'.join(lines) + '\n'
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *args):
+        self.uninstall()
+
+def subclasses(cls):
+    found = [cls]
+    for sub in cls.__subclasses__():
+        found.extend(subclasses(sub))
+    return found
+
+def inherited(cls, attr):
+    for c in cls.__mro__:
+        if attr in vars(c): return vars(c)[attr]
+    raise AttributeError(attr)
+
+profiler = Profiler()
@@ -0,0 +1,124 @@
+#===============================================================================
+# Structured output of characters. Each character becomes a record of plain
+# lists, dicts, strings and numbers, which can be written one at a time from
+# any iterable of characters as JSON Lines or CSV, so that the characters need
+# not all be held in memory at once.
+#===============================================================================
+import collections
+import cStringIO
+import json
+import csv
+
+import dungeon_world_base as base
+
+#-------------------------------------------------------------------------------
+def char_record(char):
+    return collections.OrderedDict([
+        ('name',        char.name),
+        ('gender',      char.gender),
+        ('class',       char.class_.name),
+        ('level',       char.level),
+        ('race',        race_record(char.race)),
+        ('alignment',   move_record(char.alignment)),
+        ('abilities',   collections.OrderedDict(
+            (ability, {'score': score, 'modifier': modifier})
+            for ability, score, modifier in zip(
+                base.Abilities.ability_names,
+                char.abilities.score_array,
+                char.abilities.modifier_array))),
+        ('max_hp',      char.max_hp),
+        ('damage',      {'sides': char.base_damage.sides,
+                         'add':   char.base_damage.add}),
+        ('armour',      char.armour),
+        ('load',        char.inventory.load_used),
+        ('max_load',    char.max_load),
+        ('inventory',   [item_record(item) for item in char.inventory])])
+
+def race_record(race):
+    return collections.OrderedDict([
+        ('type',        type(race).__name__),
+        ('name',        race.name),
+        ('racial_move', move_record(race.racial_move))])
+
+# Besides its name and description, a move's record has the class that the move
+# belongs to, if any, and the moves, races and other values in its slots, such
+# as the extra move chosen by Move_Human.
+def move_record(move):
+    record = collections.OrderedDict([
+        ('type',        type(move).__name__),
+        ('name',        move.name),
+        ('description', getattr(move, 'description', None))])
+    class_ = getattr(move, 'class_', None)
+    if class_ is not None:
+        record['class'] = class_.name
+    for cls in reversed(type(move).__mro__):
+        slots = cls.__dict__.get('__slots__', ())
+        for slot in (slots,) if isinstance(slots, basestring) else slots:
+            if slot in record or not hasattr(move, slot): continue
+            value = getattr(move, slot)
+            record[slot] = move_record(value) if isinstance(value, base.Move) \
+                      else race_record(value) if isinstance(value, base.Race) \
+                      else value
+    return record
+
+def item_record(item):
+    return collections.OrderedDict([
+        ('name',        item.name),
+        ('quantity',    item.quantity),
+        ('tags',        dict((tag, list(value) if type(value) is tuple
+                                   else value)
+                             for tag, value in item.tags.iteritems()))])
+
+#-------------------------------------------------------------------------------
+# JSON Lines: one JSON object per line.
+def jsonl_line(char):
+    return json.dumps(char_record(char)) + '\n'
+
+def write_jsonl(chars, file):
+    for char in chars:
+        file.write(jsonl_line(char))
+
+#-------------------------------------------------------------------------------
+# CSV: one row per character, with a column for each ability score and the
+# nested parts of the record (the racial move, the alignment and the inventory)
+# as JSON in their own columns.
+CSV_FIELDS = (
+    ('name', 'gender', 'class', 'level', 'race', 'race_type', 'racial_move',
+     'alignment', 'alignment_description')
+  + base.Abilities.ability_names
+  + ('max_hp', 'damage_sides', 'damage_add', 'armour', 'load', 'max_load',
+     'inventory'))
+
+def csv_row(char):
+    record = char_record(char)
+    race, alignment = record['race'], record['alignment']
+    row = [record['name'], record['gender'], record['class'], record['level'],
+           race['name'], race['type'], json.dumps(race['racial_move']),
+           alignment['name'], alignment['description']]
+    row.extend(a['score'] for a in record['abilities'].itervalues())
+    row.extend([record['max_hp'],
+                record['damage']['sides'], record['damage']['add'],
+                record['armour'], record['load'], record['max_load'],
+                json.dumps(record['inventory'])])
+    return [value.encode('utf-8') if isinstance(value, unicode) else value
+            for value in row]
+
+# Writes the header row, unless `header' is false, then a row for each
+# character.
+def write_csv(chars, file, header=True):
+    writer = csv.writer(file)
+    if header:
+        writer.writerow(CSV_FIELDS)
+    for char in chars:
+        writer.writerow(csv_row(char))
+
+def csv_line(char):
+    return csv_text(csv_row(char))
+
+def csv_header():
+    return csv_text(CSV_FIELDS)
+
+def csv_text(row):
+    file = cStringIO.StringIO()
+    csv.writer(file).writerow(row)
+    return file.getvalue()
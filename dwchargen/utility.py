@@ -1,53 +1,115 @@
+import hashlib
 import random
 import abc
 
 #-------------------------------------------------------------------------------
 class RegistryClass(abc.ABCMeta):
+    # The AliasTable of each registry, by id(cls.classes).
+    alias_tables = {}
+    # Incremented whenever a class is registered, so that anything derived
+    # from the registries can tell when it is out of date.
+    version = 0
+
     def __new__(mcls, name, bases, dict):
         cls = super(mcls, RegistryClass).__new__(mcls, name, bases, dict)
         if not getattr(cls, 'registry_ignore', False):
             if hasattr(cls, 'classes') and AbstractSubRegistry not in bases:
                 cls.classes.append(cls)
+                RegistryClass.alias_tables.pop(id(cls.classes), None)
+                RegistryClass.version += 1
             if any(bcls is not object and bcls is Registry for bcls in bases):
                 cls.classes = []
         return cls
 
+    def alias_table(cls):
+        table = RegistryClass.alias_tables.get(id(cls.classes))
+        if table is None:
+            table = AliasTable(cls.classes, [c.frequency for c in cls.classes])
+            RegistryClass.alias_tables[id(cls.classes)] = table
+        return table
+
 class AbstractSubRegistry(object):
     __metaclass__ = RegistryClass
+    __slots__ = ()
 
 class Registry(object):
     __metaclass__ = RegistryClass
+    __slots__ = ()
 
 class Random(object):
+    __slots__ = ()
     frequency = 1
 
     @classmethod
-    def random_class(cls):
-        if isinstance(cls, RegistryClass) and cls not in cls.classes:
-            sum_freq = 0
-            for subcls in cls.classes:
-                sum_freq += subcls.frequency
-            choice = random.uniform(0, sum_freq)
-            for subcls in cls.classes:
-                if subcls.frequency > choice: break
-                choice -= subcls.frequency
-            return subcls
-        else:
-            return cls
+    def random_class(cls, rng=random):
+        if isinstance(cls, RegistryClass):
+            table = cls.alias_table()
+            if cls not in table.members:
+                return table.sample(rng)
+        return cls
+
+    @classmethod
+    def random_classes(cls, k, rng=random):
+        if isinstance(cls, RegistryClass):
+            table = cls.alias_table()
+            if cls not in table.members:
+                return table.samples(k, rng)
+        return [cls] * k
 
     @classmethod
     def new_random(cls, *args, **kwds):
-        cls = cls.random_class()
+        cls = cls.random_class(kwds.get('rng', random))
         obj = cls()
         obj.set_random(*args, **kwds)
         return obj
 
-    def set_random(self, *args):
+    def set_random(self, *args, **kwds):
         pass
 
-    def apply_random(self, *args):
+    def apply_random(self, *args, **kwds):
         pass
 
+# Returns a seed for the `index'th of a sequence of random generators, so that
+# any one of them can be recreated from `seed' without the others.
+def derived_seed(seed, index):
+    return int(hashlib.sha1('%r/%r' % (seed, index)).hexdigest()[:16], 16)
+
+# Samples from `items' with the given relative weights in constant time, using
+# Vose's alias method.
+class AliasTable(object):
+    __slots__ = 'items', 'members', 'probs', 'aliases'
+
+    def __init__(self, items, weights):
+        n = len(items)
+        total = float(sum(weights))
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i in xrange(n) if scaled[i] < 1]
+        large = [i for i in xrange(n) if scaled[i] >= 1]
+        probs, aliases = [1.0] * n, range(n)
+        while small and large:
+            i, j = small.pop(), large.pop()
+            probs[i], aliases[i] = scaled[i], j
+            scaled[j] -= 1 - scaled[i]
+            (small if scaled[j] < 1 else large).append(j)
+        self.items = tuple(items)
+        self.members = frozenset(items)
+        self.probs = tuple(probs)
+        self.aliases = tuple(aliases)
+
+    def sample(self, rng=random):
+        u = rng.random() * len(self.items)
+        i = int(u)
+        return self.items[i if u - i < self.probs[i] else self.aliases[i]]
+
+    def samples(self, k, rng=random):
+        items, probs, aliases = self.items, self.probs, self.aliases
+        n, draw = len(items), rng.random
+        samples = []
+        for u in (draw() * n for _ in xrange(k)):
+            i = int(u)
+            samples.append(items[i if u - i < probs[i] else aliases[i]])
+        return samples
+
 class Wrapper(object):
     def __init__(self, target, **kwds):
         self.__dict__.update(kwds)
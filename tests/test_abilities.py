@@ -0,0 +1,29 @@
+import sys
+import os.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+
+from dwchargen import dungeon_world_base as base
+
+class AbilitiesTest(unittest.TestCase):
+    def test_scores_and_modifiers(self):
+        abilities = base.Abilities()
+        for ability, score in zip(base.Abilities.ability_names,
+                                  [16, 15, 13, 12, 9, 8]):
+            abilities.set_ability_score(ability, score)
+        scores, modifiers = abilities.scores, abilities.modifiers
+        self.assertEqual(dict(scores), {'strength': 16, 'dexterity': 15,
+            'constitution': 13, 'intelligence': 12, 'wisdom': 9,
+            'charisma': 8})
+        self.assertEqual(list(scores), list(base.Abilities.ability_names))
+        self.assertEqual(len(scores), 6)
+        self.assertIn('strength', scores)
+        self.assertNotIn('luck', scores)
+        self.assertEqual(scores.values(), [16, 15, 13, 12, 9, 8])
+        self.assertEqual(dict(modifiers.iteritems())['strength'], 2)
+        self.assertEqual(modifiers.get('luck', 0), 0)
+        self.assertRaises(KeyError, lambda: scores['luck'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import sys
+import os.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+import tempfile
+import shutil
+import random
+
+from dwchargen import dungeon_galaxy, fantasynamegenerators as fantasy, \
+    archive, serialize
+
+# Gives names made from the seeds, so that no names are fetched.
+class FixedBackend(object):
+    __slots__ = ()
+
+    def name_subtype(self, main_type, rng=random, deadline=None):
+        return u'%s %d' % (main_type, rng.randrange(1000)), 'female'
+
+    def name_subtypes(self, main_type, seeds, deadline=None):
+        return [self.name_subtype(main_type, random.Random(seed))
+                for seed in seeds]
+
+    def prefetch(self, *types):
+        pass
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='test_archive.')
+        self.path = os.path.join(self.dir, 'chars.dwca')
+        self.backend = fantasy.backend
+        self.cache_path = fantasy.cache.path
+        fantasy.set_cache_path(os.path.join(self.dir, 'names.db'))
+        fantasy.backends['fixed'] = FixedBackend()
+        fantasy.set_backend('fixed')
+        random.seed(1)
+        self.chars = dungeon_galaxy.generate_batch(50)
+
+    def tearDown(self):
+        fantasy.set_backend(self.backend)
+        fantasy.set_cache_path(self.cache_path)
+        del fantasy.backends['fixed']
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_round_trip(self):
+        archive.write_archive(self.chars, self.path)
+        with archive.ArchiveReader(self.path) as reader:
+            self.assertEqual(len(reader), len(self.chars))
+            self.assertEqual(
+                [serialize.char_record(char) for char in reader],
+                [serialize.char_record(char) for char in self.chars])
+            self.assertEqual(
+                [char.inventory.summarise() for char in reader],
+                [char.inventory.summarise() for char in self.chars])
+
+    def test_random_access(self):
+        archive.write_archive(self.chars, self.path)
+        with archive.ArchiveReader(self.path) as reader:
+            for k in (0, 17, -1):
+                self.assertEqual(serialize.char_record(reader[k]),
+                                 serialize.char_record(self.chars[k]))
+            self.assertRaises(IndexError, lambda: reader[len(self.chars)])
+
+    def test_shared_items(self):
+        archive.write_archive(self.chars, self.path)
+        with archive.ArchiveReader(self.path) as reader:
+            items = {}
+            for char in reader:
+                for item in char.inventory:
+                    if item.frozen:
+                        key = type(item), item.quantity, item.merge_key()
+                        self.assertIs(items.setdefault(key, item), item)
+
+    def test_not_an_archive(self):
+        with open(self.path, 'wb') as file:
+            file.write('\0' * archive.HEADER.size)
+        self.assertRaises(ValueError, archive.ArchiveReader, self.path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import sys
+import os.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+import copy
+
+from dwchargen import dungeon_world_base as base, dungeon_galaxy as galaxy
+
+class InventoryTest(unittest.TestCase):
+    def test_merge(self):
+        inventory = base.Inventory(galaxy.Item_Rations(),
+            galaxy.Item_Clothes(), galaxy.Item_Rations())
+        self.assertEqual([type(item) for item in inventory],
+                         [galaxy.Item_Rations, galaxy.Item_Clothes])
+        self.assertEqual([item.quantity for item in inventory], [2, 1])
+        inventory += [galaxy.Item_Clothes(), galaxy.Item_Antitoxin()]
+        inventory.append(galaxy.Item_Rations(quantity=3))
+        self.assertEqual([item.quantity for item in inventory], [5, 2, 1])
+
+    def test_merge_differing_tags(self):
+        inventory = base.Inventory(base.Item(name='rope', weight=1),
+            base.Item(name='rope', weight=2), base.Item(name='rope', weight=1))
+        self.assertEqual([(item.tags['weight'], item.quantity)
+                          for item in inventory], [(1, 2), (2, 1)])
+
+    def test_merge_unhashable_tags(self):
+        inventory = base.Inventory(base.Item(name='map', marks=['x']),
+                                   base.Item(name='map', marks=['x']))
+        self.assertEqual(len(inventory), 1)
+        self.assertEqual(inventory[0].quantity, 2)
+
+    def test_insert_and_remove(self):
+        inventory = base.Inventory(galaxy.Item_Rations(), galaxy.Item_Clothes())
+        inventory.insert(0, galaxy.Item_Antitoxin())
+        inventory.insert(0, galaxy.Item_Clothes())
+        self.assertEqual([(type(item), item.quantity) for item in inventory],
+            [(galaxy.Item_Antitoxin, 1), (galaxy.Item_Rations, 1),
+             (galaxy.Item_Clothes, 2)])
+        del inventory[0]
+        inventory.append(galaxy.Item_Clothes())
+        self.assertEqual([(type(item), item.quantity) for item in inventory],
+            [(galaxy.Item_Rations, 1), (galaxy.Item_Clothes, 3)])
+
+    def test_shared_prototypes(self):
+        first = base.Inventory(galaxy.Item_Rations())
+        second = base.Inventory(galaxy.Item_Rations())
+        self.assertIs(first[0], second[0])
+        self.assertRaises(AttributeError, setattr, first[0], 'quantity', 2)
+        self.assertRaises(TypeError, first[0].tags.__setitem__, 'weight', 0)
+
+        first.append(galaxy.Item_Rations())
+        self.assertEqual(first[0].quantity, 2)
+        self.assertEqual(second[0].quantity, 1)
+        self.assertIsNot(first[0], second[0])
+        first *= 2
+        self.assertEqual(first[0].quantity, 4)
+        self.assertEqual(second[0].quantity, 1)
+
+    def test_copies_are_unshared(self):
+        prototype = base.Inventory(galaxy.Item_Rations())[0]
+        item = copy.copy(prototype)
+        item.quantity = 3
+        self.assertEqual(prototype.quantity, 1)
+        self.assertIs(item.tags, prototype.tags)
+
+    def test_shared_tags(self):
+        self.assertIs(base.Item(name='a', weight=1).tags,
+                      base.Item(name='b', weight=1).tags)
+        self.assertIsNot(base.Item(name='a', weight=1).tags,
+                         base.Item(name='a', weight=2).tags)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import sys
+import os.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+import threading
+import time
+
+from dwchargen import fantasynamegenerators as fantasy
+
+class PrefetcherTest(unittest.TestCase):
+    def setUp(self):
+        self.fetches = 0
+
+    def tearDown(self):
+        self.prefetcher.stop()
+
+    def failing_fetch(self, main_type):
+        self.fetches += 1
+        time.sleep(0.2)
+        raise IOError('No names of type %s.' % main_type)
+
+    def take_all(self, count, take):
+        results = [None] * count
+        def run(i):
+            try:
+                results[i] = take()
+            except IOError as e:
+                results[i] = e
+        threads = [threading.Thread(target=run, args=(i,))
+                   for i in xrange(count)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertFalse([thread for thread in threads if thread.is_alive()])
+        return results
+
+    def test_error_reaches_every_waiter(self):
+        self.prefetcher = fantasy.NamePrefetcher(self.failing_fetch)
+        results = self.take_all(3, lambda: self.prefetcher.take('x'))
+        self.assertTrue(all(isinstance(r, IOError) for r in results))
+
+        # The error is not kept once it has been given to the waiters, so the
+        # type is fetched again.
+        fetches = self.fetches
+        results = self.take_all(3, lambda: self.prefetcher.take('x'))
+        self.assertTrue(all(isinstance(r, IOError) for r in results))
+        self.assertGreater(self.fetches, fetches)
+
+    def test_error_reaches_waiters_and_callbacks(self):
+        self.prefetcher = fantasy.NamePrefetcher(self.failing_fetch)
+        errors = []
+        self.prefetcher.take_async('x', lambda name_subtype, exc_info:
+                                   errors.append(exc_info[1]))
+        results = self.take_all(2, lambda: self.prefetcher.take('x'))
+        self.assertTrue(all(isinstance(r, IOError) for r in results))
+        self.assertEqual(len(errors), 1)
+
+    def test_names(self):
+        self.prefetcher = fantasy.NamePrefetcher(
+            lambda main_type: (u'%s name' % main_type, None))
+        results = self.take_all(5, lambda: self.prefetcher.take('x'))
+        self.assertEqual(results, [(u'x name', None)] * 5)
+
+if __name__ == '__main__':
+    unittest.main()
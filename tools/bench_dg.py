@@ -0,0 +1,279 @@
+#!/usr/bin/env python2.7
+
+import sys
+import os.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import BaseHTTPServer
+import SocketServer
+import subprocess
+import threading
+import argparse
+import tempfile
+import random
+import shutil
+import json
+import time
+import re
+
+BENCHMARKS = ('names', 'pool', 'chars')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark name fetching and '
+        'character generation against a local copy of the generator pages.')
+    parser.add_argument('benchmarks', nargs='*', default=BENCHMARKS,
+        metavar='BENCHMARK',
+        help='benchmarks to run, of: %s (default: all)' % ', '.join(BENCHMARKS))
+    parser.add_argument('--count', type=int, default=200,
+        help='names or characters to generate in each benchmark '
+             '(default: 200)')
+    parser.add_argument('--threads', type=int, default=4,
+        help='threads fetching names at once in the pool benchmark '
+             '(default: 4)')
+    parser.add_argument('--pool-size', type=int, default=4,
+        help='maximum number of browser drivers (default: 4)')
+    parser.add_argument('--pool-min-size', type=int, default=0,
+        help='number of browser drivers kept alive (default: 0)')
+    parser.add_argument('--bulk-rounds', type=int,
+        help='generator button clicks per page load (default: as in '
+             'fantasynamegenerators)')
+    parser.add_argument('--latency', type=float, default=0.0,
+        help='seconds that the local server waits before each response, to '
+             'stand in for the network (default: 0)')
+    parser.add_argument('--backend', choices=('web', 'markov'), default='web',
+        help='where character names come from (default: web)')
+    parser.add_argument('--results', default='bench_dg.results.jsonl',
+        help='file to which results are appended, and in which the previous '
+             'run with the same settings is found (default: '
+             'bench_dg.results.jsonl)')
+    parser.add_argument('--threshold', type=float, default=0.2,
+        help='relative slowdown against the previous run that counts as a '
+             'regression (default: 0.2)')
+    parser.add_argument('--check', action='store_true',
+        help='exit with status 1 if there was a regression')
+    parser.add_argument('--profile', action='store_true',
+        help='time each phase of generation and fetching with '
+             'dwchargen.profiling, and report the phases')
+    args = parser.parse_args()
+    for benchmark in args.benchmarks:
+        if benchmark not in BENCHMARKS:
+            parser.error('unknown benchmark: %s' % benchmark)
+
+    from dwchargen import dungeon_galaxy, fantasynamegenerators as fantasy
+
+    server = ReplicaServer(('127.0.0.1', 0), ReplicaHandler)
+    server.latency = args.latency
+    threading.Thread(target=server.serve_forever).start()
+    cache_dir = tempfile.mkdtemp(prefix='bench_dg.')
+    try:
+        fantasy.base_url = 'http://127.0.0.1:%d/' % server.server_address[1]
+        fantasy.set_cache_path(os.path.join(cache_dir, 'names.db'))
+        fantasy.configure_pool(
+            min_size=args.pool_min_size, max_size=args.pool_size)
+        if args.bulk_rounds is not None:
+            fantasy.bulk_rounds = args.bulk_rounds
+        fantasy.set_backend(args.backend)
+        if args.profile:
+            from dwchargen import profiling
+            profiling.profiler.install()
+
+        settings = {
+            'count':        args.count,
+            'threads':      args.threads,
+            'pool_size':    args.pool_size,
+            'pool_min_size': args.pool_min_size,
+            'bulk_rounds':  fantasy.bulk_rounds,
+            'latency':      args.latency,
+            'backend':      args.backend}
+        results = {}
+        for benchmark in args.benchmarks:
+            results[benchmark] = globals()['bench_' + benchmark](args)
+        results['pool_stats'] = fantasy.pool.stats()
+        if args.profile:
+            results['profile'] = profiling.profiler.stats()
+    finally:
+        fantasy.shutdown()
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    previous = previous_results(args.results, settings)
+    record = {
+        'time':     time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'settings': settings,
+        'results':  results}
+    with open(args.results, 'a') as file:
+        file.write(json.dumps(record, sort_keys=True) + '\n')
+
+    regressions = report(results, previous, args.threshold)
+    if args.check and regressions:
+        sys.exit(1)
+
+#-------------------------------------------------------------------------------
+# Each benchmark returns a summary of the time taken by each operation.
+
+def bench_names(args):
+    from dwchargen import dungeon_galaxy, fantasynamegenerators as fantasy
+    types = sorted(dungeon_galaxy.name_types())
+    return timed(args.count,
+        lambda: fantasy.random_name_subtype(random.choice(types)))
+
+def bench_pool(args):
+    from dwchargen import dungeon_galaxy, fantasynamegenerators as fantasy
+    types = sorted(dungeon_galaxy.name_types())
+    times = []
+    def run(count):
+        for i in xrange(count):
+            start = time.time()
+            fantasy.fetch_names(random.choice(types))
+            times.append(time.time() - start)
+    counts = [args.count // args.threads + (i < args.count % args.threads)
+              for i in xrange(args.threads)]
+    threads = [threading.Thread(target=run, args=(count,)) for count in counts]
+    start = time.time()
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    return summary(times, time.time() - start)
+
+def bench_chars(args):
+    from dwchargen import dungeon_galaxy
+    return timed(args.count, dungeon_galaxy.Char.new_random)
+
+def timed(count, f):
+    times = []
+    start = time.time()
+    for i in xrange(count):
+        op_start = time.time()
+        f()
+        times.append(time.time() - op_start)
+    return summary(times, time.time() - start)
+
+def summary(times, elapsed):
+    times = sorted(times)
+    return {
+        'count':        len(times),
+        'per_second':   len(times) / elapsed if elapsed else None,
+        'mean_s':       sum(times) / len(times) if times else None,
+        'p50_s':        percentile(times, 50),
+        'p90_s':        percentile(times, 90),
+        'p99_s':        percentile(times, 99),
+        'max_s':        times[-1] if times else None}
+
+# The nearest-rank percentile of a sorted list.
+def percentile(times, p):
+    if not times: return None
+    return times[max(0, -(-len(times) * p // 100) - 1)]
+
+#-------------------------------------------------------------------------------
+def previous_results(path, settings):
+    previous = None
+    try:
+        with open(path) as file:
+            for line in file:
+                record = json.loads(line)
+                if record['settings'] == settings:
+                    previous = record
+    except IOError:
+        pass
+    return previous
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Prints the results, compared with the previous ones if there are any, and
+# returns the number of regressions.
+def report(results, previous, threshold):
+    regressions = 0
+    if previous is not None:
+        print 'Compared with %s (revision %s):' % (
+            previous['time'], previous['revision'])
+    for benchmark in BENCHMARKS:
+        if benchmark not in results: continue
+        result = results[benchmark]
+        old = previous['results'].get(benchmark) if previous else None
+        print '%-6s %6d in total, %8.1f per second' % (
+            benchmark, result['count'], result['per_second'] or 0.0)
+        for key in ('mean_s', 'p50_s', 'p90_s', 'p99_s', 'max_s'):
+            line = '       %-4s %10.2f ms' % (key[:-2], result[key]*1000)
+            if old and old.get(key) and key != 'max_s':
+                change = result[key] / old[key] - 1
+                line += ' %+7.1f%%' % (change*100)
+                if change > threshold:
+                    line += ' REGRESSION'
+                    regressions += 1
+            print line
+    print 'pool   %s' % ', '.join(
+        '%s=%s' % item for item in sorted(results['pool_stats'].items()))
+    if 'profile' in results:
+        print 'phase               count    total s       p50 ms       p99 ms'
+        for phase, s in results['profile'].iteritems():
+            print '%-18s %6d %10.3f %12.3f %12.3f' % (
+                phase, s['count'], s['sum'], s['p50']*1000, s['p99']*1000)
+    return regressions
+
+#-------------------------------------------------------------------------------
+# Serves a copy of a fantasynamegenerators.com generator page for any name
+# type: a #nameGen element of buttons which each fill #result with ten names.
+class ReplicaServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    latency = 0.0
+
+class ReplicaHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        match = re.match(r'^/([a-z0-9_-]+?)[-_]names\.php$', self.path)
+        time.sleep(self.server.latency)
+        if match is None:
+            self.send_error(404)
+            return
+        page = PAGE % {'title': match.group(1).replace('-', ' ').title()}
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def log_message(self, *args):
+        pass
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<title>%(title)s names</title>
+<script>
+var syllables = ['ka', 'vor', 'el', 'ith', 'ra', 'mun', 'dra', 'sol', 'quen',
+                 'ta', 'bel', 'or', 'ny', 'zar', 'ul', 'gor', 'wyn', 'ae'];
+function nameGen(type) {
+    var names = [];
+    for (var i = 0; i < 10; i++) {
+        var name = '', n = 2 + Math.floor(Math.random() * 2);
+        for (var j = 0; j < n; j++)
+            name += syllables[Math.floor(Math.random() * syllables.length)];
+        names.push(name.charAt(0).toUpperCase() + name.slice(1));
+    }
+    document.getElementById('result').innerHTML = names.join('<br>');
+}
+</script>
+</head>
+<body>
+<h1>%(title)s names</h1>
+<div id="nameGen">
+<input type="button" value="Get male names" onclick="nameGen(0)">
+<input type="button" value="Get female names" onclick="nameGen(1)">
+</div>
+<div id="result"></div>
+</body>
+</html>
+"""
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
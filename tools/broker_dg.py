@@ -0,0 +1,51 @@
+#!/usr/bin/env python2.7
+
+import sys
+import os.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import signal
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a name broker, which '
+        'fetches names with one pool of browsers for any number of processes '
+        'generating characters with the "broker" name backend, such as '
+        'generate_dg.py --backend broker.')
+    parser.add_argument('--address', metavar='PATH',
+        help='Unix socket to listen on (default: as in dwchargen.broker)')
+    parser.add_argument('--cache', metavar='PATH',
+        help='database of fetched names (default: '
+             'fantasynamegenerators.cache.db)')
+    parser.add_argument('--pool-size', type=int, default=4,
+        help='maximum number of browser drivers (default: 4)')
+    parser.add_argument('--pool-min-size', type=int, default=0,
+        help='number of browser drivers kept alive (default: 0)')
+    parser.add_argument('--max-pending', type=int, default=256,
+        help='names of one type that may be waited for at once before '
+             'further requests for that type must wait (default: 256)')
+    parser.add_argument('--debug', action='store_true',
+        help='log failed requests and the activity of the browser driver '
+             'pools')
+    args = parser.parse_args()
+
+    from dwchargen import fantasynamegenerators as fantasy, broker
+    if args.cache is not None: fantasy.set_cache_path(args.cache)
+    fantasy.configure_pool(min_size=args.pool_min_size,
+        max_size=args.pool_size, debug=args.debug)
+    server = broker.NameBroker(
+        args.address if args.address is not None else broker.address,
+        max_pending=args.max_pending, debug=args.debug)
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    sys.stderr.write('Serving names at %s.\n' % server.address)
+    try:
+        server.serve_forever()
+    finally:
+        server.close()
+        fantasy.shutdown()
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
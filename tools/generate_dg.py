@@ -0,0 +1,154 @@
+#!/usr/bin/env python2.7
+
+import sys
+import os.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import multiprocessing
+import multiprocessing.util
+import argparse
+import random
+import json
+import time
+
+FORMATS = ('text', 'json', 'jsonl', 'csv', 'archive')
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate random Dungeon Galaxy characters.')
+    parser.add_argument('--count', type=int, default=1,
+        help='number of characters to generate (default: 1)')
+    parser.add_argument('--workers', type=int,
+        default=multiprocessing.cpu_count(),
+        help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--batch-size', type=int, default=10,
+        help='characters generated together by each worker (default: 10)')
+    parser.add_argument('--seed', type=int,
+        help='seed for reproducible generation, apart from names fetched '
+             'from the web; character N of a run can be regenerated alone '
+             'with generate_batch(1, SEED, N)')
+    parser.add_argument('--format', choices=FORMATS, default='text',
+        help='output format: text as shown by print_lines, the same lines as '
+             'a JSON list per character, or one structured record per '
+             'character as JSON Lines, CSV or a binary archive readable with '
+             'dwchargen.archive.ArchiveReader (default: text)')
+    parser.add_argument('--output', type=argparse.FileType('w'),
+        default=sys.stdout,
+        help='file to write the characters to (default: standard output)')
+    parser.add_argument('--backend', choices=('web', 'markov', 'broker'),
+        default='web',
+        help='where character names come from: the web, offline models, or '
+             'a name broker shared with other processes, as started by '
+             'broker_dg.py (default: web)')
+    parser.add_argument('--broker', metavar='ADDRESS',
+        help='Unix socket path of the name broker (default: as in '
+             'dwchargen.broker)')
+    parser.add_argument('--cache', metavar='PATH',
+        help='database of fetched names (default: '
+             'fantasynamegenerators.cache.db)')
+    parser.add_argument('--pool-size', type=int, default=4,
+        help='maximum number of browser drivers in each worker (default: 4)')
+    parser.add_argument('--pool-min-size', type=int, default=0,
+        help='number of browser drivers kept alive in each worker (default: 0)')
+    parser.add_argument('--debug', action='store_true',
+        help='log the activity of the browser driver pools')
+    parser.add_argument('--quiet', action='store_true',
+        help='do not show progress on standard error')
+    args = parser.parse_args()
+    if args.format == 'archive' and args.output is sys.stdout:
+        parser.error('--format archive requires --output')
+
+    seed = args.seed if args.seed is not None else random.randrange(2**32)
+    batches = [(start, min(args.batch_size, args.count - start))
+               for start in xrange(0, args.count, args.batch_size)]
+
+    # The library is only imported by the workers, so that each of them
+    # starts its own driver pool and name cache connection after forking.
+    pool = multiprocessing.Pool(
+        args.workers, init_worker,
+        (args.backend, args.broker, args.cache, args.pool_min_size,
+         args.pool_size, args.format, seed))
+    start_time = time.time()
+    done = 0
+    writer = None
+    try:
+        if args.format == 'csv':
+            from dwchargen import serialize
+            args.output.write(serialize.csv_header())
+        elif args.format == 'archive':
+            from dwchargen import archive
+            args.output.close()
+            writer = archive.ArchiveWriter(args.output.name, args.count)
+        # Batches finish in any order; they are written in order, holding
+        # back any that finish before those preceding them.
+        finished, next_start = {}, 0
+        for start, records in pool.imap_unordered(generate, batches):
+            if writer is not None:
+                for i, record in enumerate(records):
+                    writer.add_encoded(record, start + i)
+            else:
+                finished[start] = records
+                while next_start in finished:
+                    ready = finished.pop(next_start)
+                    for record in ready:
+                        args.output.write(record)
+                    next_start += len(ready)
+                args.output.flush()
+            done += len(records)
+            if not args.quiet:
+                elapsed = time.time() - start_time
+                sys.stderr.write('\r%d/%d characters, %.1f per second.' % (
+                    done, args.count, done / elapsed if elapsed else 0.0))
+        pool.close()
+        if writer is not None: writer.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        if not args.quiet: sys.stderr.write('\n')
+
+worker = {}
+
+def init_worker(backend, broker_address, cache_path, pool_min_size, pool_size,
+                format, seed):
+    from dwchargen import dungeon_galaxy, fantasynamegenerators
+    if cache_path is not None:
+        fantasynamegenerators.set_cache_path(cache_path)
+    fantasynamegenerators.configure_pool(
+        min_size=pool_min_size, max_size=pool_size)
+    if backend == 'broker':
+        from dwchargen import broker
+        if broker_address is not None: broker.address = broker_address
+    fantasynamegenerators.set_backend(backend)
+    multiprocessing.util.Finalize(
+        None, fantasynamegenerators.shutdown, exitpriority=10)
+    worker.update(format=format, seed=seed)
+
+def generate((start, count)):
+    from dwchargen import dungeon_galaxy
+    return start, [format_char(char, worker['format'])
+                   for char in dungeon_galaxy.generate_batch(
+                       count, worker['seed'], start)]
+
+def format_char(char, format):
+    from dwchargen import serialize, archive
+    if format == 'text':
+        return '\n'.join(char.show_lines() + ['---', ''])
+    elif format == 'json':
+        return json.dumps(char.show_lines()) + '\n'
+    elif format == 'jsonl':
+        return serialize.jsonl_line(char)
+    elif format == 'csv':
+        return serialize.csv_line(char)
+    elif format == 'archive':
+        if 'type_ids' not in worker:
+            worker['type_ids'] = {cls: i for i, (cls, name)
+                                  in enumerate(archive.type_names())}
+        return archive.encode_char(char, worker['type_ids'])
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,254 @@
+#!/usr/bin/env python2.7
+
+import sys
+import os.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import BaseHTTPServer
+import SocketServer
+import collections
+import threading
+import argparse
+import urlparse
+import signal
+import json
+import time
+import os
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve random Dungeon Galaxy '
+        'characters over HTTP, keeping the browser drivers and name caches '
+        'warm between requests. GET /characters?count=N&class=CLASS returns '
+        'a JSON list of N character records, as written by '
+        'dwchargen.serialize; GET /stats returns the state of the server.')
+    parser.add_argument('--host', default='127.0.0.1',
+        help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8086,
+        help='port to listen on (default: 8086)')
+    parser.add_argument('--socket', metavar='PATH',
+        help='listen on a Unix socket at PATH instead of a TCP port')
+    parser.add_argument('--window', type=float, default=0.05,
+        help='seconds for which requests are collected after the first one '
+             'arrives, to be generated as one batch whose names are fetched '
+             'together (default: 0.05)')
+    parser.add_argument('--max-count', type=int, default=1000,
+        help='largest number of characters that one request may ask for '
+             '(default: 1000)')
+    parser.add_argument('--timeout', type=float,
+        help='seconds within which the names of a batch are resolved, using '
+             'cached or offline names if there is not time to fetch them '
+             '(default: no limit)')
+    parser.add_argument('--backend', choices=('web', 'markov'), default='web',
+        help='where character names come from (default: web)')
+    parser.add_argument('--cache', metavar='PATH',
+        help='database of fetched names (default: '
+             'fantasynamegenerators.cache.db)')
+    parser.add_argument('--pool-size', type=int, default=4,
+        help='maximum number of browser drivers (default: 4)')
+    parser.add_argument('--pool-min-size', type=int, default=0,
+        help='number of browser drivers kept alive (default: 0)')
+    parser.add_argument('--debug', action='store_true',
+        help='log requests and the activity of the browser driver pools')
+    args = parser.parse_args()
+
+    from dwchargen import dungeon_galaxy, fantasynamegenerators as fantasy
+    if args.cache is not None: fantasy.set_cache_path(args.cache)
+    fantasy.set_backend(args.backend)
+    fantasy.configure_pool(min_size=args.pool_min_size, max_size=args.pool_size)
+    fantasy.prefetch_names(*dungeon_galaxy.name_types())
+
+    batcher = Batcher(args.window, args.timeout)
+    if args.socket is not None:
+        if os.path.exists(args.socket): os.unlink(args.socket)
+        server = UnixCharServer(args.socket, CharHandler)
+        address = args.socket
+    else:
+        server = CharServer((args.host, args.port), CharHandler)
+        address = 'http://%s:%d/' % server.server_address[:2]
+    server.batcher = batcher
+    server.max_count = args.max_count
+    server.debug = args.debug
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    sys.stderr.write('Serving characters at %s.\n' % address)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        batcher.stop()
+        fantasy.shutdown()
+        if args.socket is not None and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+#-------------------------------------------------------------------------------
+# Generates the characters asked for by concurrent requests together: requests
+# that arrive within `window' seconds of the first are made into one batch, so
+# that the names of all their characters are fetched at once.
+class Batcher(object):
+    def __init__(self, window=0.05, timeout=None):
+        self.window = window
+        self.timeout = timeout
+        self.condition = threading.Condition(threading.Lock())
+        self.jobs = []
+        self.stopped = False
+        self.batches = 0
+        self.requests = 0
+        self.chars = 0
+        self.thread = threading.Thread(target=self.run_worker)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # Returns `count' new characters, of the class `class_' if it is given.
+    def generate(self, count, class_=None):
+        job = Job(count, class_)
+        with self.condition:
+            if self.stopped: raise RuntimeError('The batcher is stopped.')
+            self.jobs.append(job)
+            self.condition.notify()
+        job.done.wait()
+        if job.exc_info is not None:
+            raise job.exc_info[0], job.exc_info[1], job.exc_info[2]
+        return job.chars
+
+    def run_worker(self):
+        while True:
+            with self.condition:
+                while not self.jobs and not self.stopped:
+                    self.condition.wait()
+                if self.stopped: return
+            time.sleep(self.window)
+            with self.condition:
+                jobs, self.jobs = self.jobs, []
+            self.run_batch(jobs)
+
+    def run_batch(self, jobs):
+        from dwchargen import dungeon_galaxy
+        try:
+            deadline = time.time() + self.timeout \
+                       if self.timeout is not None else None
+            for job in jobs:
+                job.chars = dungeon_galaxy.generate_batch(job.count,
+                    lazy=True, deadline=deadline, class_=job.class_)
+            dungeon_galaxy.resolve_batch(
+                [char for job in jobs for char in job.chars], deadline)
+        except:
+            for job in jobs:
+                job.exc_info = sys.exc_info()
+        with self.condition:
+            self.batches += 1
+            self.requests += len(jobs)
+            self.chars += sum(job.count for job in jobs)
+        for job in jobs:
+            job.done.set()
+
+    def stats(self):
+        with self.condition:
+            return collections.OrderedDict([
+                ('batches',     self.batches),
+                ('requests',    self.requests),
+                ('chars',       self.chars),
+                ('waiting',     len(self.jobs))])
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            jobs, self.jobs = self.jobs, []
+            self.condition.notify()
+        for job in jobs:
+            try:
+                raise RuntimeError('The batcher is stopped.')
+            except RuntimeError:
+                job.exc_info = sys.exc_info()
+            job.done.set()
+
+class Job(object):
+    __slots__ = 'count', 'class_', 'chars', 'exc_info', 'done'
+
+    def __init__(self, count, class_):
+        self.count = count
+        self.class_ = class_
+        self.chars = None
+        self.exc_info = None
+        self.done = threading.Event()
+
+#-------------------------------------------------------------------------------
+class CharServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+class UnixCharServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+class CharHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        query = urlparse.parse_qs(url.query)
+        if url.path == '/characters':
+            self.get_characters(query)
+        elif url.path == '/stats':
+            from dwchargen import fantasynamegenerators as fantasy
+            self.send_json(200, collections.OrderedDict([
+                ('batches', self.server.batcher.stats()),
+                ('pool',    fantasy.pool.stats())]))
+        else:
+            self.send_json(404, {'error': 'Not found: %s' % url.path})
+
+    def get_characters(self, query):
+        from dwchargen import serialize
+        try:
+            count = int(query.get('count', ['1'])[-1])
+        except ValueError:
+            count = None
+        if count is None or not 0 <= count <= self.server.max_count:
+            self.send_json(400, {'error': 'count must be an integer from 0 '
+                'to %d.' % self.server.max_count})
+            return
+        class_ = None
+        if 'class' in query:
+            class_ = find_class(query['class'][-1])
+            if class_ is None:
+                self.send_json(400, {'error': 'Unknown class: %s. The '
+                    'classes are: %s.' % (query['class'][-1], ', '.join(
+                        class_names()))})
+                return
+        try:
+            chars = self.server.batcher.generate(count, class_)
+        except Exception as e:
+            self.send_json(500, {'error': '%s: %s' % (type(e).__name__, e)})
+            return
+        self.send_json(200, [serialize.char_record(char) for char in chars])
+
+    def send_json(self, status, value):
+        body = json.dumps(value)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Unix socket clients have no address.
+    def address_string(self):
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'unix'
+
+    def log_message(self, *args):
+        if self.server.debug:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, *args)
+
+# The class of the given name, ignoring case and spaces, or None.
+def find_class(name):
+    from dwchargen import dungeon_galaxy
+    key = name.replace(' ', '').lower()
+    for class_ in dungeon_galaxy.Class.classes:
+        if key in (class_.__name__.lower(),
+                   class_.name.replace(' ', '').lower()):
+            return class_
+
+def class_names():
+    from dwchargen import dungeon_galaxy
+    return [class_.name for class_ in dungeon_galaxy.Class.classes]
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass